@@ -1,6 +1,8 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from openai import OpenAI
+import atexit
+import functools
+import hashlib
 import json
 import datetime
 import requests
@@ -8,358 +10,102 @@ import re
 import random
 import string
 import base64
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
 from datetime import timedelta
 
+import conversions
+import http_pool
+import logs
+import numtheory
+from breaker import CircuitBreaker
+from cache import ResponseCache, SingleFlight, TTLCache
+from context import ContextWindow
+from expr import evaluate
+from llm_pool import Provider, ProviderPool
+from ratelimit import AdmissionGate, RateLimiter, make_bucket_store, retry_after_header
+from metrics import render_json, render_prometheus, request_trace, span, submit_in_context, timed_tool
+from registry import Param, ToolArgumentError, ToolRegistry
+from replies import ReplyPolicy, render_replies, render_reply
+from router import FastPathRouter, detect_intent
+from sandbox import SandboxError, SandboxPool
+from sessions import MAX_CONVERSATION_ID_LENGTH, InvalidConversation, make_session_store, new_conversation_id
+from toolselect import ToolSelector
+
 app = Flask(__name__)
 CORS(app)
 
-# Initialize Groq client
-client = OpenAI(
-    api_key="Your Api Key",
-    base_url="https://api.groq.com/openai/v1"
+log = logs.get_logger("chat")
+tool_log = logs.get_logger("tools")
+
+# LLM providers (any OpenAI-compatible endpoint works, e.g. a local stub for benchmarks)
+LLM_API_KEY = os.environ.get("LLM_API_KEY", "Your Api Key")
+LLM_BASE_URL = os.environ.get("LLM_BASE_URL", "https://api.groq.com/openai/v1")
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 30))
+
+MODEL = os.environ.get("LLM_MODEL", "llama-3.3-70b-versatile")
+
+def make_breaker():
+    """While a provider is failing or slow, skip it instead of letting every request wait for its own timeout"""
+    return CircuitBreaker(
+        window=int(os.environ.get("LLM_BREAKER_WINDOW", 20)),
+        min_calls=int(os.environ.get("LLM_BREAKER_MIN_CALLS", 5)),
+        failure_rate=float(os.environ.get("LLM_BREAKER_FAILURE_RATE", 0.5)),
+        slow_seconds=float(os.environ.get("LLM_BREAKER_SLOW_SECONDS", 10)),
+        open_seconds=float(os.environ.get("LLM_BREAKER_OPEN_SECONDS", 30)),
+        probe_seconds=float(os.environ.get("LLM_BREAKER_PROBE_SECONDS", 60))
+    )
+
+def load_providers():
+    """Providers from LLM_PROVIDERS, or the single LLM_* endpoint.
+
+    LLM_PROVIDERS is a JSON list such as
+    [{"name": "groq", "base_url": "...", "api_key_env": "GROQ_API_KEY", "model": "...", "weight": 3, "max_concurrency": 32}]
+    """
+    configs = json.loads(os.environ.get("LLM_PROVIDERS") or "[]") or [
+        {"name": "default", "base_url": LLM_BASE_URL, "api_key": LLM_API_KEY, "model": MODEL}
+    ]
+    return [
+        Provider(
+            name=config.get("name", config["base_url"]),
+            base_url=config["base_url"],
+            api_key=config.get("api_key") or os.environ.get(config.get("api_key_env", "LLM_API_KEY"), LLM_API_KEY),
+            model=config.get("model", MODEL),
+            weight=float(config.get("weight", 1)),
+            max_concurrency=int(config.get("max_concurrency", 32)),
+            timeout=float(config.get("timeout", LLM_TIMEOUT)),
+            breaker=make_breaker()
+        )
+        for config in configs
+    ]
+
+llm_pool = ProviderPool(
+    load_providers(),
+    hedge=os.environ.get("LLM_HEDGE", "1") == "1",
+    hedge_percentile=float(os.environ.get("LLM_HEDGE_PERCENTILE", 0.95)),
+    hedge_min_samples=int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", 20))
 )
 
-MODEL = "llama-3.3-70b-versatile"
-
-# Define ALL tools
-tools = [
-    # TIME & DATE TOOLS
-    {
-        "type": "function",
-        "function": {
-            "name": "get_time",
-            "description": "Get current date and time",
-            "parameters": {"type": "object", "properties": {}, "required": []}
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "calculate_age",
-            "description": "Calculate age from birth date",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "birth_date": {"type": "string", "description": "Birth date in YYYY-MM-DD format"}
-                },
-                "required": ["birth_date"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "days_until",
-            "description": "Calculate days until a future date",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "date": {"type": "string", "description": "Target date in YYYY-MM-DD format"}
-                },
-                "required": ["date"]
-            }
-        }
-    },
-    
-    # MATH TOOLS
-    {
-        "type": "function",
-        "function": {
-            "name": "calculator",
-            "description": "Calculate mathematical expressions",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "expression": {"type": "string", "description": "Math expression like '2+2' or '10*5'"}
-                },
-                "required": ["expression"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "is_prime",
-            "description": "Check if a number is prime",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "number": {"type": "integer", "description": "Number to check"}
-                },
-                "required": ["number"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "factorial",
-            "description": "Calculate factorial of a number",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "number": {"type": "integer", "description": "Number for factorial"}
-                },
-                "required": ["number"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "fibonacci",
-            "description": "Generate Fibonacci sequence",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "count": {"type": "integer", "description": "How many numbers to generate"}
-                },
-                "required": ["count"]
-            }
-        }
-    },
-    
-    # INFORMATION TOOLS
-    {
-        "type": "function",
-        "function": {
-            "name": "get_weather",
-            "description": "Get weather for a city",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "city": {"type": "string", "description": "City name"}
-                },
-                "required": ["city"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "search_wikipedia",
-            "description": "Search Wikipedia for information",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "Search query"}
-                },
-                "required": ["query"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_random_fact",
-            "description": "Get a random interesting fact",
-            "parameters": {"type": "object", "properties": {}, "required": []}
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_joke",
-            "description": "Get a random joke",
-            "parameters": {"type": "object", "properties": {}, "required": []}
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_quote",
-            "description": "Get an inspirational quote",
-            "parameters": {"type": "object", "properties": {}, "required": []}
-        }
-    },
-    
-    # TEXT TOOLS
-    {
-        "type": "function",
-        "function": {
-            "name": "count_words",
-            "description": "Count words in text",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "text": {"type": "string", "description": "Text to count words in"}
-                },
-                "required": ["text"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "reverse_text",
-            "description": "Reverse text",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "text": {"type": "string", "description": "Text to reverse"}
-                },
-                "required": ["text"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "text_to_uppercase",
-            "description": "Convert text to uppercase",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "text": {"type": "string", "description": "Text to convert"}
-                },
-                "required": ["text"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "text_to_lowercase",
-            "description": "Convert text to lowercase",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "text": {"type": "string", "description": "Text to convert"}
-                },
-                "required": ["text"]
-            }
-        }
-    },
-    
-    # CONVERSION TOOLS
-    {
-        "type": "function",
-        "function": {
-            "name": "convert_currency",
-            "description": "Convert currency (mock exchange rates)",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "amount": {"type": "number", "description": "Amount to convert"},
-                    "from_currency": {"type": "string", "description": "Source currency (USD, EUR, INR, etc)"},
-                    "to_currency": {"type": "string", "description": "Target currency"}
-                },
-                "required": ["amount", "from_currency", "to_currency"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "convert_temperature",
-            "description": "Convert temperature between units",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "value": {"type": "number", "description": "Temperature value"},
-                    "from_unit": {"type": "string", "description": "Source unit (C, F, K)"},
-                    "to_unit": {"type": "string", "description": "Target unit (C, F, K)"}
-                },
-                "required": ["value", "from_unit", "to_unit"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "encode_base64",
-            "description": "Encode text to Base64",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "text": {"type": "string", "description": "Text to encode"}
-                },
-                "required": ["text"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "decode_base64",
-            "description": "Decode Base64 to text",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "encoded": {"type": "string", "description": "Base64 encoded string"}
-                },
-                "required": ["encoded"]
-            }
-        }
-    },
-    
-    # RANDOM/FUN TOOLS
-    {
-        "type": "function",
-        "function": {
-            "name": "roll_dice",
-            "description": "Roll dice",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "sides": {"type": "integer", "description": "Number of sides on the dice (default 6)"}
-                },
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "flip_coin",
-            "description": "Flip a coin",
-            "parameters": {"type": "object", "properties": {}, "required": []}
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "generate_password",
-            "description": "Generate a random password",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "length": {"type": "integer", "description": "Password length (default 12)"}
-                },
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "random_number",
-            "description": "Generate random number in range",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "min": {"type": "integer", "description": "Minimum value"},
-                    "max": {"type": "integer", "description": "Maximum value"}
-                },
-                "required": ["min", "max"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "magic_8ball",
-            "description": "Get a Magic 8-Ball answer",
-            "parameters": {"type": "object", "properties": {}, "required": []}
-        }
-    }
-]
+def complete(**kwargs):
+    """chat.completions.create on the provider pool; raises CircuitOpenError when every provider is unavailable.
+
+    `model` is chosen per provider, so any model passed in is ignored.
+    """
+    return llm_pool.complete(**kwargs)
+
 
 # ============================================
 # TOOL IMPLEMENTATIONS
 # ============================================
 
+# Each tool is declared once, on its implementation; the LLM schema list, the
+# dispatch table, /tools categories and argument validators are all derived from it
+DEFAULT_TOOL_TIMEOUT = 5
+tool_registry = ToolRegistry(default_timeout=DEFAULT_TOOL_TIMEOUT)
+
 # TIME & DATE TOOLS
+@tool_registry.tool("Time & Date", "Get current date and time")
 def get_time():
     now = datetime.datetime.now()
     return {
@@ -369,6 +115,8 @@ def get_time():
         "success": True
     }
 
+@tool_registry.tool("Time & Date", "Calculate age from birth date",
+                    birth_date=Param("string", "Birth date in YYYY-MM-DD format"))
 def calculate_age(birth_date):
     try:
         birth = datetime.datetime.strptime(birth_date, '%Y-%m-%d')
@@ -383,6 +131,8 @@ def calculate_age(birth_date):
     except:
         return {"tool": "Age Calculator 🎂", "input": birth_date, "output": "Invalid date format", "success": False}
 
+@tool_registry.tool("Time & Date", "Calculate days until a future date",
+                    date=Param("string", "Target date in YYYY-MM-DD format"))
 def days_until(date):
     try:
         target = datetime.datetime.strptime(date, '%Y-%m-%d')
@@ -398,33 +148,49 @@ def days_until(date):
         return {"tool": "Countdown ⏳", "input": date, "output": "Invalid date", "success": False}
 
 # MATH TOOLS
+@tool_registry.tool("Math", "Calculate mathematical expressions", cacheable=True, cpu_bound=True,
+                    expression=Param("string", "Math expression like '2+2' or '10*5'"))
 def calculator(expression):
     try:
-        result = eval(expression, {"__builtins__": {}}, {})
+        result = evaluate(expression)
         return {"tool": "Calculator 🧮", "input": expression, "output": f"{expression} = {result}", "success": True}
     except Exception as e:
         return {"tool": "Calculator 🧮", "input": expression, "output": f"Error: {str(e)}", "success": False}
 
+# Input caps and output size for the number tools, so one request can't stall the server
+PRIME_MAX_DIGITS = int(os.environ.get("PRIME_MAX_DIGITS", 100))
+FACTORIAL_MAX_N = int(os.environ.get("FACTORIAL_MAX_N", 10 ** 9))
+FACTORIAL_FULL_DIGITS = int(os.environ.get("FACTORIAL_FULL_DIGITS", 300))  # longer results are not printed in full
+FACTORIAL_OUTPUT = os.environ.get("FACTORIAL_OUTPUT", "truncated")  # "truncated" or "digits" for long results
+
+@tool_registry.tool("Math", "Check if a number is prime", cacheable=True, cpu_bound=True,
+                    number=Param("integer", "Number to check"))
 def is_prime(number):
-    if number < 2:
-        result = "No"
-    else:
-        for i in range(2, int(number ** 0.5) + 1):
-            if number % i == 0:
-                result = "No"
-                break
-        else:
-            result = "Yes"
+    if abs(number) >= 10 ** PRIME_MAX_DIGITS:
+        return {"tool": "Prime Checker 🔢", "input": f"{len(str(abs(number)))}-digit number", "output": f"Error: Number too large (max {PRIME_MAX_DIGITS} digits)", "success": False}
+    result = "Yes" if numtheory.is_prime(number) else "No"
     return {"tool": "Prime Checker 🔢", "input": str(number), "output": f"{number} is prime: {result}", "success": True}
 
+@tool_registry.tool("Math", "Calculate factorial of a number", cacheable=True, cpu_bound=True,
+                    number=Param("integer", "Number for factorial"))
 def factorial(number):
     if number < 0:
         return {"tool": "Factorial ❗", "input": str(number), "output": "Error: Negative number", "success": False}
-    result = 1
-    for i in range(1, number + 1):
-        result *= i
-    return {"tool": "Factorial ❗", "input": str(number), "output": f"{number}! = {result}", "success": True}
+    if number > FACTORIAL_MAX_N:
+        return {"tool": "Factorial ❗", "input": str(number), "output": f"Error: Number too large (max {FACTORIAL_MAX_N})", "success": False}
+    
+    digits = numtheory.factorial_digits(number)
+    if digits <= FACTORIAL_FULL_DIGITS:
+        output = f"{number}! = {numtheory.factorial(number)}"
+    elif FACTORIAL_OUTPUT == "digits":
+        output = f"{number}! has {digits:,} digits"
+    else:
+        zeros = numtheory.factorial_trailing_zeros(number)
+        output = f"{number}! ≈ {numtheory.factorial_scientific(number)} ({digits:,} digits, {zeros:,} trailing zeros)"
+    return {"tool": "Factorial ❗", "input": str(number), "output": output, "success": True}
 
+@tool_registry.tool("Math", "Generate Fibonacci sequence", cacheable=True,
+                    count=Param("integer", "How many numbers to generate"))
 def fibonacci(count):
     if count <= 0:
         return {"tool": "Fibonacci 🔢", "input": str(count), "output": "Count must be positive", "success": False}
@@ -434,6 +200,8 @@ def fibonacci(count):
     return {"tool": "Fibonacci 🔢", "input": str(count), "output": str(fib[:count]), "success": True}
 
 # INFORMATION TOOLS
+@tool_registry.tool("Information", "Get weather for a city",
+                    city=Param("string", "City name"))
 def get_weather(city):
     weather_db = {
         "Chennai": {"temp": "32°C", "condition": "Sunny ☀️", "humidity": "70%"},
@@ -453,109 +221,102 @@ def get_weather(city):
         "success": True
     }
 
-def search_wikipedia(query):
-    try:
-        # Properly capitalize the query for Wikipedia
-        formatted_query = "_".join(word.capitalize() for word in query.strip().split())
-        
-        url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{formatted_query}"
-        
-        # Wikipedia requires a User-Agent header
-        headers = {
-            'User-Agent': 'ChatbotApp/1.0 (Educational Purpose; contact@example.com)',
-            'Accept': 'application/json'
-        }
-        
-        print(f"  📚 Fetching: {url}")
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        print(f"  📚 Status: {response.status_code}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Check if it's a disambiguation page
-            if data.get('type') == 'disambiguation':
-                return {
-                    "tool": "Wikipedia 📚",
-                    "input": query,
-                    "output": f"Multiple results found for '{query}'. Please be more specific.",
-                    "success": False
-                }
-            
-            extract = data.get('extract', '')
-            
-            if extract:
-                summary = extract[:500] + "..." if len(extract) > 500 else extract
-                return {
-                    "tool": "Wikipedia 📚",
-                    "input": query,
-                    "output": summary,
-                    "success": True
-                }
-            else:
-                return {
-                    "tool": "Wikipedia 📚",
-                    "input": query,
-                    "output": "No information found",
-                    "success": False
-                }
-                
-        elif response.status_code == 404:
-            # Try alternative formats
-            alternatives = [
-                query.replace(' ', '_'),  # Original with underscores
-                query.title().replace(' ', '_'),  # Title case
-                query.upper().replace(' ', '_')   # Upper case
-            ]
-            
-            for alt_query in alternatives:
-                url_alt = f"https://en.wikipedia.org/api/rest_v1/page/summary/{alt_query}"
-                response_alt = requests.get(url_alt, headers=headers, timeout=10)
-                
-                if response_alt.status_code == 200:
-                    data = response_alt.json()
-                    extract = data.get('extract', '')
-                    if extract:
-                        summary = extract[:500] + "..." if len(extract) > 500 else extract
-                        return {
-                            "tool": "Wikipedia 📚",
-                            "input": query,
-                            "output": summary,
-                            "success": True
-                        }
+# Wikipedia requires a User-Agent header
+WIKIPEDIA_HEADERS = {
+    'User-Agent': 'ChatbotApp/1.0 (Educational Purpose; contact@example.com)',
+    'Accept': 'application/json'
+}
+
+# Overridable so benchmarks can point at benchmarks/wikipedia_stub.py
+WIKIPEDIA_BASE_URL = os.environ.get("WIKIPEDIA_BASE_URL", "https://en.wikipedia.org").rstrip("/")
+WIKIPEDIA_SUMMARY_URL = WIKIPEDIA_BASE_URL + "/api/rest_v1/page/summary/{}"
+
+wikipedia_cache = TTLCache(
+    maxsize=int(os.environ.get("WIKIPEDIA_CACHE_SIZE", 1024)),
+    ttl=int(os.environ.get("WIKIPEDIA_CACHE_TTL", 6 * 3600)),
+    negative_ttl=int(os.environ.get("WIKIPEDIA_NEGATIVE_TTL", 600))
+)
+
+def wikipedia_result(query, output, success):
+    return {"tool": "Wikipedia 📚", "input": query, "output": output, "success": success}
+
+def wikipedia_alternatives(query):
+    """Title spellings to try after the capitalized form returns 404"""
+    return [
+        query.replace(' ', '_'),  # Original with underscores
+        query.title().replace(' ', '_'),  # Title case
+        query.upper().replace(' ', '_')   # Upper case
+    ]
+
+def summarize_wikipedia_page(query, data, check_disambiguation=True):
+    """Turn a page summary payload into a tool result, or None if it has no extract"""
+    # Check if it's a disambiguation page
+    if check_disambiguation and data.get('type') == 'disambiguation':
+        return wikipedia_result(query, f"Multiple results found for '{query}'. Please be more specific.", False)
+    
+    extract = data.get('extract', '')
+    if extract:
+        summary = extract[:500] + "..." if len(extract) > 500 else extract
+        return wikipedia_result(query, summary, True)
+    return None
+
+class WikipediaError(Exception):
+    """Transient lookup failure; never cached"""
+
+def normalize_wikipedia_query(query):
+    return " ".join(query.lower().split())
+
+def fetch_wikipedia(query):
+    # Properly capitalize the query for Wikipedia
+    formatted_query = "_".join(word.capitalize() for word in query.strip().split())
+    
+    url = WIKIPEDIA_SUMMARY_URL.format(formatted_query)
+    
+    response = http_pool.get(url, headers=WIKIPEDIA_HEADERS, timeout=10)
+    tool_log.debug("📚 Wikipedia fetch", url=url, status=response.status_code)
+    
+    if response.status_code == 200:
+        result = summarize_wikipedia_page(query, response.json())
+        return result or wikipedia_result(query, "No information found", False)
             
-            return {
-                "tool": "Wikipedia 📚",
-                "input": query,
-                "output": f"No Wikipedia article found for '{query}'",
-                "success": False
-            }
+    elif response.status_code == 404:
+        # Try alternative formats
+        for alt_query in wikipedia_alternatives(query):
+            url_alt = WIKIPEDIA_SUMMARY_URL.format(alt_query)
+            response_alt = http_pool.get(url_alt, headers=WIKIPEDIA_HEADERS, timeout=10)
             
-        else:
-            return {
-                "tool": "Wikipedia 📚",
-                "input": query,
-                "output": f"Wikipedia returned error {response.status_code}",
-                "success": False
-            }
+            if response_alt.status_code == 200:
+                result = summarize_wikipedia_page(query, response_alt.json(), check_disambiguation=False)
+                if result:
+                    return result
+        
+        return wikipedia_result(query, f"No Wikipedia article found for '{query}'", False)
+        
+    else:
+        raise WikipediaError(f"Wikipedia returned error {response.status_code}")
+
+# Up to four sequential HTTP requests; network-bound, so batches run it on the tool pool
+@tool_registry.tool("Information", "Search Wikipedia for information", timeout=15, parallel=True,
+                    query=Param("string", "Search query"))
+def search_wikipedia(query):
+    try:
+        # Misses (404s, disambiguation pages) are cached too, for a shorter time
+        result = wikipedia_cache.get_or_load(
+            normalize_wikipedia_query(query),
+            lambda: fetch_wikipedia(query),
+            is_negative=lambda r: not r["success"]
+        )
+        return dict(result, input=query)
             
     except requests.exceptions.Timeout:
-        return {
-            "tool": "Wikipedia 📚",
-            "input": query,
-            "output": "Wikipedia request timed out. Please try again.",
-            "success": False
-        }
+        return wikipedia_result(query, "Wikipedia request timed out. Please try again.", False)
+    except WikipediaError as e:
+        return wikipedia_result(query, str(e), False)
     except Exception as e:
-        print(f"  ❌ Error: {str(e)}")
-        return {
-            "tool": "Wikipedia 📚",
-            "input": query,
-            "output": f"Search error: {str(e)}",
-            "success": False
-        }
+        tool_log.error("❌ Wikipedia error", query=query, error=str(e))
+        return wikipedia_result(query, f"Search error: {str(e)}", False)
 
+@tool_registry.tool("Information", "Get a random interesting fact", nondeterministic=True)
 def get_random_fact():
     facts = [
         "Honey never spoils. Archaeologists have found 3000-year-old honey in Egyptian tombs that's still edible!",
@@ -570,6 +331,7 @@ def get_random_fact():
     fact = random.choice(facts)
     return {"tool": "Random Fact 🤓", "input": "Get fact", "output": fact, "success": True}
 
+@tool_registry.tool("Information", "Get a random joke", nondeterministic=True)
 def get_joke():
     jokes = [
         "Why don't scientists trust atoms? Because they make up everything!",
@@ -583,6 +345,7 @@ def get_joke():
     joke = random.choice(jokes)
     return {"tool": "Joke Machine 😂", "input": "Tell joke", "output": joke, "success": True}
 
+@tool_registry.tool("Information", "Get an inspirational quote", nondeterministic=True)
 def get_quote():
     quotes = [
         "The only way to do great work is to love what you do. - Steve Jobs",
@@ -596,29 +359,55 @@ def get_quote():
     return {"tool": "Quote Generator 💭", "input": "Get quote", "output": quote, "success": True}
 
 # TEXT TOOLS
+@tool_registry.tool("Text", "Count words in text", cacheable=True,
+                    text=Param("string", "Text to count words in"))
 def count_words(text):
     words = len(text.split())
     chars = len(text)
     return {"tool": "Word Counter 📝", "input": text[:50], "output": f"Words: {words}, Characters: {chars}", "success": True}
 
+@tool_registry.tool("Text", "Reverse text", cacheable=True,
+                    text=Param("string", "Text to reverse"))
 def reverse_text(text):
     return {"tool": "Text Reverser 🔄", "input": text, "output": text[::-1], "success": True}
 
+@tool_registry.tool("Text", "Convert text to uppercase", cacheable=True,
+                    text=Param("string", "Text to convert"))
 def text_to_uppercase(text):
     return {"tool": "Uppercase Converter 🔤", "input": text, "output": text.upper(), "success": True}
 
+@tool_registry.tool("Text", "Convert text to lowercase", cacheable=True,
+                    text=Param("string", "Text to convert"))
 def text_to_lowercase(text):
     return {"tool": "Lowercase Converter 🔡", "input": text, "output": text.lower(), "success": True}
 
 # CONVERSION TOOLS
+# List inputs are listed in full up to this many items, then summarized
+CONVERSION_LIST_PREVIEW = 10
+
+def format_conversions(inputs, results, fmt):
+    pairs = [fmt(x, y) for x, y in zip(inputs[:CONVERSION_LIST_PREVIEW], results)]
+    if len(inputs) > CONVERSION_LIST_PREVIEW:
+        pairs.append(f"... ({len(inputs)} values)")
+    return "; ".join(pairs)
+
+@tool_registry.tool("Conversion", "Convert currency (mock exchange rates)", cacheable=True,
+                    amount=Param("numbers", "Amount to convert, or a list of amounts"),
+                    from_currency=Param("string", "Source currency (USD, EUR, INR, etc)"),
+                    to_currency=Param("string", "Target currency"))
 def convert_currency(amount, from_currency, to_currency):
-    rates = {
-        "USD": 1.0, "EUR": 0.85, "GBP": 0.73, "INR": 83.0, "JPY": 110.0,
-        "AUD": 1.35, "CAD": 1.25, "CNY": 6.5
-    }
-    from_rate = rates.get(from_currency.upper(), 1.0)
-    to_rate = rates.get(to_currency.upper(), 1.0)
-    result = (amount / from_rate) * to_rate
+    try:
+        result = conversions.affine(amount, conversions.currency_factor(from_currency, to_currency))
+    except OverflowError:
+        return {"tool": "Currency Converter 💱", "input": f"{from_currency} to {to_currency}", "output": "Error: Amount too large to convert", "success": False}
+    if isinstance(amount, list):
+        return {
+            "tool": "Currency Converter 💱",
+            "input": f"{len(amount)} amounts in {from_currency}",
+            "output": format_conversions(amount, result, lambda x, y: f"{x} {from_currency} = {y:.2f} {to_currency}"),
+            "results": [round(y, 2) for y in result],
+            "success": True
+        }
     return {
         "tool": "Currency Converter 💱",
         "input": f"{amount} {from_currency}",
@@ -626,24 +415,26 @@ def convert_currency(amount, from_currency, to_currency):
         "success": True
     }
 
+@tool_registry.tool("Conversion", "Convert temperature between units", cacheable=True,
+                    value=Param("numbers", "Temperature value, or a list of values"),
+                    from_unit=Param("string", "Source unit (C, F, K)"),
+                    to_unit=Param("string", "Target unit (C, F, K)"))
 def convert_temperature(value, from_unit, to_unit):
     from_unit = from_unit.upper()
     to_unit = to_unit.upper()
     
-    if from_unit == 'F':
-        celsius = (value - 32) * 5/9
-    elif from_unit == 'K':
-        celsius = value - 273.15
-    else:
-        celsius = value
-    
-    if to_unit == 'F':
-        result = celsius * 9/5 + 32
-    elif to_unit == 'K':
-        result = celsius + 273.15
-    else:
-        result = celsius
-    
+    try:
+        result = conversions.affine(value, *conversions.temperature_map(from_unit, to_unit))
+    except OverflowError:
+        return {"tool": "Temperature Converter 🌡️", "input": f"°{from_unit} to °{to_unit}", "output": "Error: Temperature too large to convert", "success": False}
+    if isinstance(value, list):
+        return {
+            "tool": "Temperature Converter 🌡️",
+            "input": f"{len(value)} values in °{from_unit}",
+            "output": format_conversions(value, result, lambda x, y: f"{x}°{from_unit} = {y:.2f}°{to_unit}"),
+            "results": [round(y, 2) for y in result],
+            "success": True
+        }
     return {
         "tool": "Temperature Converter 🌡️",
         "input": f"{value}°{from_unit}",
@@ -651,10 +442,14 @@ def convert_temperature(value, from_unit, to_unit):
         "success": True
     }
 
+@tool_registry.tool("Conversion", "Encode text to Base64", cacheable=True,
+                    text=Param("string", "Text to encode"))
 def encode_base64(text):
     encoded = base64.b64encode(text.encode()).decode()
     return {"tool": "Base64 Encoder 🔐", "input": text, "output": encoded, "success": True}
 
+@tool_registry.tool("Conversion", "Decode Base64 to text", cacheable=True,
+                    encoded=Param("string", "Base64 encoded string"))
 def decode_base64(encoded):
     try:
         decoded = base64.b64decode(encoded).decode()
@@ -663,23 +458,34 @@ def decode_base64(encoded):
         return {"tool": "Base64 Decoder 🔓", "input": encoded, "output": "Invalid Base64", "success": False}
 
 # RANDOM/FUN TOOLS
+@tool_registry.tool("Random/Fun", "Roll dice", nondeterministic=True,
+                    sides=Param("integer", "Number of sides on the dice (default 6)"))
 def roll_dice(sides=6):
+    if sides < 1:
+        return {"tool": "Dice Roller 🎲", "input": f"{sides}-sided dice", "output": "Error: A dice needs at least 1 side", "success": False}
     result = random.randint(1, sides)
     return {"tool": f"Dice Roller 🎲", "input": f"{sides}-sided dice", "output": f"You rolled: {result}", "success": True}
 
+@tool_registry.tool("Random/Fun", "Flip a coin", nondeterministic=True)
 def flip_coin():
     result = random.choice(["Heads", "Tails"])
     return {"tool": "Coin Flip 🪙", "input": "Flip coin", "output": f"Result: {result}", "success": True}
 
+@tool_registry.tool("Random/Fun", "Generate a random password", cpu_bound=True, nondeterministic=True,
+                    length=Param("integer", "Password length (default 12)"))
 def generate_password(length=12):
     chars = string.ascii_letters + string.digits + "!@#$%^&*"
     password = ''.join(random.choice(chars) for _ in range(length))
     return {"tool": "Password Generator 🔑", "input": f"Length: {length}", "output": password, "success": True}
 
+@tool_registry.tool("Random/Fun", "Generate random number in range", nondeterministic=True,
+                    min=Param("integer", "Minimum value"),
+                    max=Param("integer", "Maximum value"))
 def random_number(min, max):
     result = random.randint(min, max)
     return {"tool": "Random Number 🎰", "input": f"{min} to {max}", "output": f"Random number: {result}", "success": True}
 
+@tool_registry.tool("Random/Fun", "Get a Magic 8-Ball answer", nondeterministic=True)
 def magic_8ball():
     answers = [
         "Yes, definitely!", "It is certain.", "Without a doubt.", "You may rely on it.",
@@ -692,126 +498,74 @@ def magic_8ball():
     answer = random.choice(answers)
     return {"tool": "Magic 8-Ball 🎱", "input": "Shake", "output": answer, "success": True}
 
-# Function mapping
-available_functions = {
-    "get_time": get_time,
-    "calculate_age": calculate_age,
-    "days_until": days_until,
-    "calculator": calculator,
-    "is_prime": is_prime,
-    "factorial": factorial,
-    "fibonacci": fibonacci,
-    "get_weather": get_weather,
-    "search_wikipedia": search_wikipedia,
-    "get_random_fact": get_random_fact,
-    "get_joke": get_joke,
-    "get_quote": get_quote,
-    "count_words": count_words,
-    "reverse_text": reverse_text,
-    "text_to_uppercase": text_to_uppercase,
-    "text_to_lowercase": text_to_lowercase,
-    "convert_currency": convert_currency,
-    "convert_temperature": convert_temperature,
-    "encode_base64": encode_base64,
-    "decode_base64": decode_base64,
-    "roll_dice": roll_dice,
-    "flip_coin": flip_coin,
-    "generate_password": generate_password,
-    "random_number": random_number,
-    "magic_8ball": magic_8ball
-}
+tools = tool_registry.schemas()
+
+# Tools marked cpu_bound run in pre-forked worker processes with per-call CPU and
+# memory limits, so a huge factorial can't hold the GIL against every other
+# conversation; everything else stays inline
+SANDBOX_ENABLED = os.environ.get("SANDBOX", "1") == "1"
+sandbox = SandboxPool(
+    tool_registry.functions("cpu_bound"),
+    workers=int(os.environ.get("SANDBOX_WORKERS", 0)) or None,  # default: one per core
+    cpu_seconds=float(os.environ.get("SANDBOX_CPU_SECONDS", 2)),
+    memory_mb=int(os.environ.get("SANDBOX_MEMORY_MB", 256))
+) if SANDBOX_ENABLED else None
+if sandbox:
+    atexit.register(sandbox.close)
+
+def sandboxed(name, tool):
+    """Validate here, run in the sandbox; a killed or failed call becomes an error result"""
+    def call(**kwargs):
+        func_args = tool.validate(kwargs)
+        try:
+            return sandbox.call(name, func_args)
+        except SandboxError as e:
+            tool_log.warning("🧱 Sandboxed tool failed", tool=name, error=str(e))
+            return tool_error_result(name, func_args, f"Error: {e}")
+    call.__name__ = name
+    return call
+
+def dispatch(name, tool):
+    return timed_tool(name, sandboxed(name, tool) if sandbox and tool.cpu_bound else tool)
+
+# Every call site (LLM turns, fast path, fallback, batch) goes through this table, so
+# each call has its arguments checked and is timed under tool_call_seconds{tool=...}
+available_functions = tool_registry.dispatch_table(wrap=dispatch)
+
+# Tool calls from one model turn run on a bounded pool, each with its own timeout (seconds)
+TOOL_WORKERS = int(os.environ.get("TOOL_WORKERS", 8))
+TOOL_TIMEOUTS = tool_registry.timeouts()
+
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+def tool_timeout(func_name):
+    return TOOL_TIMEOUTS.get(func_name, DEFAULT_TOOL_TIMEOUT)
+
+def tool_error_result(func_name, func_args, output):
+    return {
+        "tool": func_name,
+        "input": json.dumps(func_args),
+        "output": output,
+        "success": False
+    }
+
+def tool_timeout_result(func_name, func_args):
+    return tool_error_result(func_name, func_args, f"Timed out after {tool_timeout(func_name)}s")
 
 # ============================================
 # SMART FALLBACK DETECTION
 # ============================================
 
 def detect_and_execute_tool(user_message):
-    """Smart fallback: detect intent and execute tools directly"""
-    msg = user_message.lower()
-    
-    # Wikipedia
-    if any(word in msg for word in ['who is', 'what is', 'tell me about', 'search for', 'wikipedia', 'who are']):
-        query = re.sub(r'(who is|who are|what is|what are|tell me about|search for|search|wikipedia|on wikipedia|\?)', '', user_message, flags=re.IGNORECASE)
-        query = query.strip()
-        if query:
-            return search_wikipedia(query)
-    
-    # Weather
-    if 'weather' in msg or 'temperature' in msg:
-        cities = ['chennai', 'mumbai', 'delhi', 'bangalore', 'kolkata', 'hyderabad', 
-                  'new york', 'london', 'tokyo', 'paris']
-        for city in cities:
-            if city in msg:
-                return get_weather(city.title())
-        return get_weather('Chennai')
-    
-    # Calculator
-    math_pattern = r'[\d\+\-\*/\(\)\.\s]+'
-    if any(word in msg for word in ['calculate', 'compute', 'what is', "what's", 'solve']):
-        matches = re.findall(math_pattern, user_message)
-        if matches:
-            expression = max(matches, key=len).strip()
-            if expression and any(op in expression for op in ['+', '-', '*', '/']):
-                return calculator(expression)
-    
-    # Time/Date
-    if any(word in msg for word in ['time', 'date', 'today', 'now', 'hi', 'hello', 'hey']):
-        return get_time()
-    
-    # Joke
-    if any(word in msg for word in ['joke', 'funny', 'laugh', 'humor']):
-        return get_joke()
-    
-    # Fact
-    if any(word in msg for word in ['fact', 'interesting', 'trivia']):
-        return get_random_fact()
-    
-    # Quote
-    if any(word in msg for word in ['quote', 'inspire', 'motivation', 'motivate']):
-        return get_quote()
-    
-    # Dice
-    if 'dice' in msg or 'roll' in msg:
-        sides = 6
-        if '20' in msg:
-            sides = 20
-        elif '12' in msg:
-            sides = 12
-        return roll_dice(sides)
-    
-    # Coin
-    if 'coin' in msg or 'flip' in msg or 'heads' in msg or 'tails' in msg:
-        return flip_coin()
-    
-    # Password
-    if 'password' in msg:
-        numbers = re.findall(r'\d+', user_message)
-        length = int(numbers[0]) if numbers else 12
-        return generate_password(length)
-    
-    # Magic 8 Ball
-    if '8 ball' in msg or 'magic 8' in msg or '8ball' in msg:
-        return magic_8ball()
-    
-    # Prime
-    if 'prime' in msg:
-        numbers = re.findall(r'\d+', user_message)
-        if numbers:
-            return is_prime(int(numbers[0]))
-    
-    # Factorial
-    if 'factorial' in msg:
-        numbers = re.findall(r'\d+', user_message)
-        if numbers:
-            return factorial(int(numbers[0]))
-    
-    # Fibonacci
-    if 'fibonacci' in msg or 'fib' in msg:
-        numbers = re.findall(r'\d+', user_message)
-        count = int(numbers[0]) if numbers else 10
-        return fibonacci(count)
-    
-    return None
+    """Smart fallback: detect intent and execute tools directly.
+
+    Returns (func_name, result), or (None, None) when no tool applies.
+    """
+    with span("fallback_detection"):
+        intent = detect_intent(user_message)
+    if intent is None:
+        return None, None
+    return intent["name"], available_functions[intent["name"]](**intent["arguments"])
 
 def parse_groq_function_syntax(text):
     """Parse Groq's XML-like function call syntax when it appears as text"""
@@ -830,169 +584,840 @@ def parse_groq_function_syntax(text):
     return None, None
 
 # ============================================
-# FLASK ROUTES
+# CHAT PIPELINE
 # ============================================
 
-@app.route('/chat', methods=['POST'])
-def chat():
-    data = request.json
-    user_message = data.get('message', '')
-    conversation_history = data.get('history', [])
+SYSTEM_PROMPT = """You are a friendly AI assistant with 25+ tools! Be conversational and warm.
+
+Keep responses brief and natural (2-3 sentences max). Use a warm, engaging tone."""
+
+FALLBACK_GREETING = "I'm here to help! I have 25+ tools including Wikipedia, calculator, weather, and more. What would you like to know? 😊"
+
+def summarize_history(previous_summary, new_messages):
+    """Fold older turns into the rolling summary with a short, cheap completion"""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in new_messages)
+    response = complete(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": "Summarize the conversation so far in at most 5 short bullet points. Keep names, numbers and open questions."},
+            {"role": "user", "content": f"Earlier summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"}
+        ],
+        temperature=0.2,
+        max_tokens=150
+    )
+    return response.choices[0].message.content
+
+context_window = ContextWindow(
+    budget=int(os.environ.get("CONTEXT_TOKEN_BUDGET", 1500)),
+    summary_budget=int(os.environ.get("CONTEXT_SUMMARY_BUDGET", 200)),
+    refresh_after=int(os.environ.get("CONTEXT_SUMMARY_REFRESH", 6)),
+    summarize=summarize_history
+)
+
+def build_messages(user_message, conversation_history, conversation_id=None):
+    """Build the prompt: system prompt, summary of older turns, recent turns that fit the budget, new message"""
+    with span("build_prompt"):
+        return context_window.build(SYSTEM_PROMPT, conversation_history, user_message, conversation_key=conversation_id)
+
+def run_started(started, func, func_args):
+    """Run a pooled tool call, noting when it left the queue so its timeout starts there"""
+    started.append(time.monotonic())
+    return func(**func_args)
+
+def await_tool(func_name, func_args, future, started):
+    timeout = tool_timeout(func_name)
+    try:
+        # The timeout counts from when the call starts running; while it is still
+        # queued behind other turns' calls, check back once per timeout
+        while True:
+            remaining = started[0] + timeout - time.monotonic() if started else timeout
+            try:
+                result = future.result(timeout=max(0, remaining))
+                break
+            except FutureTimeout:
+                if started and started[0] + timeout <= time.monotonic():
+                    raise
+        tool_log.debug("✓ Tool result", tool=func_name, output=result['output'])
+        return result
+    except FutureTimeout:
+        tool_log.warning("⏱️ Tool timed out", tool=func_name, timeout=tool_timeout(func_name))
+        return tool_timeout_result(func_name, func_args)
+    except ToolArgumentError as e:
+        tool_log.warning("⚠️ Invalid tool arguments", tool=func_name, error=str(e))
+        return tool_error_result(func_name, func_args, str(e))
+
+# ============================================
+# TURN LOGIC (shared with async_app)
+# ============================================
+
+# The pieces of a turn that do no I/O of their own; answer_turn, chat_stream
+# and their async twins differ only in how they wait for the LLM and the tools
+
+def parse_tool_calls(response_message):
+    """The tool calls of a non-streamed completion as {"id", "name", "arguments"} dicts"""
+    return [
+        {"id": tc.id, "name": tc.function.name, "arguments": tc.function.arguments}
+        for tc in response_message.tool_calls
+    ]
+
+def merge_tool_call_delta(tool_calls, tc):
+    """Fold one streamed tool-call fragment into tool_calls (index -> call)"""
+    call = tool_calls.setdefault(tc.index, {"id": None, "name": "", "arguments": ""})
+    if tc.id:
+        call["id"] = tc.id
+    if tc.function and tc.function.name:
+        call["name"] += tc.function.name
+    if tc.function and tc.function.arguments:
+        call["arguments"] += tc.function.arguments
+
+def tool_calls_message(tool_calls, content):
+    """The assistant message that asked for tool_calls, as the API expects it back"""
+    return {
+        "role": "assistant",
+        "content": content or "",
+        "tool_calls": [
+            {
+                "id": tc["id"],
+                "type": "function",
+                "function": {"name": tc["name"], "arguments": tc["arguments"]}
+            } for tc in tool_calls
+        ]
+    }
+
+def tool_result_message(tool_call, func_name, result):
+    return {
+        "tool_call_id": tool_call["id"],
+        "role": "tool",
+        "name": func_name,
+        "content": json.dumps(result)
+    }
+
+def templated_reply(tool_calls, tool_calls_info, reply_style):
+    """The templated answer for a turn's tool results, or None when the LLM should phrase it"""
+    func_names = [tc["name"] for tc in tool_calls if tc["name"] in available_functions]
+    if reply_policy.use_template(func_names, reply_style, llm_pool.load()):
+        return render_replies(func_names, tool_calls_info)
+    return None
+
+def fallback_plan(user_message, messages, func_name, tool_result, reply_style):
+    """(prompt, default) for a turn whose tool selection failed.
+
+    `prompt` is what the LLM should answer, or None when the templated
+    `default` is the answer; `default` is also used if that completion fails.
+    """
+    if not tool_result:
+        return messages, FALLBACK_GREETING
+    log.info("✅ Fallback detected", tool=tool_result['tool'], output=tool_result['output'])
+    default = render_reply(func_name, tool_result)
+    if reply_policy.use_template([func_name], reply_style, llm_pool.load()):
+        return None, default
+    return fallback_messages(user_message, tool_result), default
+
+def run_tool_calls(tool_calls, content, messages):
+    """Execute the model's tool calls and append the results to messages"""
+    tool_calls_info = []
     
-    print(f"\n{'='*60}")
-    print(f"💬 User: {user_message}")
-    print(f"{'='*60}")
+    messages.append(tool_calls_message(tool_calls, content))
     
-    messages = [
-        {
-            "role": "system", 
-            "content": """You are a friendly AI assistant with 25+ tools! Be conversational and warm.
+    # Independent tool calls run concurrently; results are still appended in call order
+    pending = []
+    for tool_call in tool_calls:
+        func_name = tool_call["name"]
+        if func_name not in available_functions:
+            continue
+        try:
+            func_args = json.loads(tool_call["arguments"] or "{}")
+        except ValueError:
+            # Reported back to the model like any other failed tool call
+            pending.append((tool_call, func_name, tool_call["arguments"], None, None))
+            continue
+        
+        tool_log.info("→ Tool call", tool=func_name, arguments=func_args)
+        
+        started = []
+        future = submit_in_context(tool_executor, run_started, started, available_functions[func_name], func_args)
+        pending.append((tool_call, func_name, func_args, future, started))
+    
+    for tool_call, func_name, func_args, future, started in pending:
+        if future is None:
+            result = tool_error_result(func_name, func_args, f"Invalid arguments for {func_name}: not valid JSON")
+        else:
+            result = await_tool(func_name, func_args, future, started)
+        tool_calls_info.append(result)
+        messages.append(tool_result_message(tool_call, func_name, result))
+    
+    return tool_calls_info
 
-Keep responses brief and natural (2-3 sentences max). Use a warm, engaging tone."""
-        }
+def fallback_messages(user_message, tool_result):
+    """Prompt used to phrase a fallback tool result naturally"""
+    prompt = f"User asked: '{user_message}'\n\nTool: {tool_result['tool']}\nResult: {tool_result['output']}\n\nRespond naturally in 2-3 sentences."
+    return [
+        {"role": "system", "content": "You are a friendly AI. Respond naturally based on the tool result."},
+        {"role": "user", "content": prompt}
     ]
+
+def extend_history(conversation_history, user_message, final_message):
+    return conversation_history + [
+        {"role": "user", "content": user_message},
+        {"role": "assistant", "content": final_message}
+    ]
+
+# The memory store keeps at most SESSION_MAX conversations, dropping the least recently used
+session_store = make_session_store(
+    backend=os.environ.get("SESSION_STORE", "memory"),
+    ttl=int(os.environ.get("SESSION_TTL", 24 * 3600)),
+    max_sessions=int(os.environ.get("SESSION_MAX", 10000)),
+    path=os.environ.get("SESSION_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db"))
+)
+
+def load_conversation(data):
+    """Return (conversation_id, history) for a request.
+
+    Clients that still send the full `history` are served statelessly, as before.
+    Raises InvalidConversation for anything but a list of history or a short string ID.
+    """
+    if 'history' in data:
+        history = data.get('history') or []
+        if not isinstance(history, list) or not all(isinstance(m, dict) for m in history):
+            raise InvalidConversation("history must be a list of messages")
+        return None, history
+    conversation_id = data.get('conversation_id') or new_conversation_id()
+    if not isinstance(conversation_id, str) or len(conversation_id) > MAX_CONVERSATION_ID_LENGTH:
+        raise InvalidConversation(f"conversation_id must be a string of at most {MAX_CONVERSATION_ID_LENGTH} characters")
+    return conversation_id, session_store.get(conversation_id)
+
+def save_turn(conversation_id, conversation_history, user_message, final_message):
+    """Persist the turn and return the conversation fields for the response body"""
+    if conversation_id is None:
+        return {"history": extend_history(conversation_history, user_message, final_message)}
+    session_store.append(conversation_id, [
+        {"role": "user", "content": user_message},
+        {"role": "assistant", "content": final_message}
+    ])
+    return {"conversation_id": conversation_id}
+
+# Tools whose output depends only on their arguments. Answers built solely on
+# these can be replayed from the response cache without calling the LLM.
+CACHEABLE_TOOLS = tool_registry.names("cacheable")
+
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE", "0") == "1"
+
+response_cache = ResponseCache(
+    maxsize=int(os.environ.get("RESPONSE_CACHE_SIZE", 2048)),
+    ttl=int(os.environ.get("RESPONSE_CACHE_TTL", 3600))
+)
+
+def cached_answer(user_message, conversation_history):
+    """(final_message, tool_calls_info) for a repeated deterministic question, or None"""
+    # A follow-up like "and to INR?" means something different in every conversation
+    if not RESPONSE_CACHE_ENABLED or conversation_history:
+        return None
+    with span("response_cache"):
+        cached = response_cache.lookup(user_message)
+    if cached:
+        log.info("⚡ Response cache hit")
+    return cached
+
+def remember_answer(user_message, conversation_history, tool_calls, tool_calls_info, final_message):
+    if not RESPONSE_CACHE_ENABLED or conversation_history or not final_message:
+        return
+    if not all(tc["name"] in CACHEABLE_TOOLS for tc in tool_calls):
+        return
+    if not all(info["success"] for info in tool_calls_info):
+        return
+    calls = [(tc["name"], json.loads(tc["arguments"] or "{}")) for tc in tool_calls]
+    response_cache.store(user_message, calls, (final_message, tool_calls_info))
+
+# Tool results are answered from replies.py templates instead of a second completion
+# unless the policy (tool, the request's "reply_style", LLM load) asks for LLM phrasing
+reply_policy = ReplyPolicy(
+    mode=os.environ.get("REPLY_STYLE", "auto"),
+    load_threshold=float(os.environ.get("REPLY_TEMPLATE_LOAD", 0.75))
+)
+
+# Tool selection sends only the schemas the message looks like it needs; small talk
+# gets none and anything unrecognized gets the full list
+tool_selector = ToolSelector(
+    tools,
+    max_tools=int(os.environ.get("TOOL_SELECTION_MAX", 6)),
+    enabled=os.environ.get("TOOL_SELECTION", "1") == "1"
+)
+
+def select_tools(user_message):
+    """tools/tool_choice arguments for the tool-selection completion"""
+    with span("tool_selection"):
+        selected, reason = tool_selector.select(user_message)
+    saved = tool_selector.record(selected, reason)
+    log.info("🧰 Tool selection", reason=reason, tools=len(selected), tokens_saved=saved)
+    return {"tools": selected, "tool_choice": "auto"} if selected else {}
+
+# Identical first messages from fresh sessions ("hi", "what is 2+2") arriving together
+# share one LLM turn, unless the message calls for a nondeterministic tool: two
+# users asking for a joke or a password must not get the same one
+COALESCE_ENABLED = os.environ.get("COALESCE", "1") == "1"
+NONDETERMINISTIC_TOOLS = tool_registry.names("nondeterministic")
+turn_flight = SingleFlight()
+
+def coalesce_key(user_message, messages, conversation_history, reply_style, tool_args):
+    """Key shared by identical concurrent turns, or None when this turn must run on its own.
+
+    `tool_args` is the turn's select_tools() result. With TOOL_SELECTION=0 every
+    tool is offered, so the check uses the tools the message itself calls for.
+    """
+    if not COALESCE_ENABLED or conversation_history:
+        return None
+    offered = tool_args.get("tools", [])
+    needed = offered if tool_selector.enabled else tool_selector.match(user_message)[0]
+    if any(schema["function"]["name"] in NONDETERMINISTIC_TOOLS for schema in needed):
+        return None
+    return json.dumps([messages, reply_style, [schema["function"]["name"] for schema in offered]], sort_keys=True)
+
+def coalesced_answer_turn(user_message, messages, conversation_history, reply_style=None):
+    """answer_turn, shared with identical no-history turns already in flight when the policy allows"""
+    tool_args = select_tools(user_message)
+    key = coalesce_key(user_message, messages, conversation_history, reply_style, tool_args)
+    if key is None:
+        return answer_turn(user_message, messages, reply_style, conversation_history, tool_args)
+    return turn_flight.do(key, lambda: answer_turn(user_message, messages, reply_style, conversation_history, tool_args))
+
+# High-confidence intents ("flip a coin", "roll a d20", "calculate 12*7") skip the LLM entirely
+FAST_PATH_ENABLED = os.environ.get("FAST_PATH", "1") == "1"
+FAST_PATH_TEMPLATES = os.environ.get("FAST_PATH_TEMPLATES", "1") == "1"
+
+fast_path_router = FastPathRouter(threshold=float(os.environ.get("FAST_PATH_THRESHOLD", 0.85)))
+
+def fast_path_answer(user_message, reply_style=None):
+    """(final_message, tool_calls_info) when the message can skip tool selection, else None"""
+    if not FAST_PATH_ENABLED:
+        return None
+    with span("fast_path_routing"):
+        intent = fast_path_router.route(user_message)
+    if intent is None:
+        return None
     
-    for msg in conversation_history[-6:]:
-        if msg.get('role') in ['user', 'assistant'] and msg.get('content'):
-            messages.append({"role": msg['role'], "content": msg['content']})
+    start = time.perf_counter()
+    log.info("⚡ Fast path", tool=intent['name'], confidence=round(intent['confidence'], 2))
+    try:
+        result = available_functions[intent["name"]](**intent["arguments"])
+    except Exception as e:
+        # A bad extraction shouldn't fail the request; the normal LLM turn handles it
+        log.warning("⚠️ Fast path tool failed, using the LLM", tool=intent['name'], error=str(e))
+        return None
     
-    messages.append({"role": "user", "content": user_message})
+    final_message = None
+    style = reply_style or ("template" if FAST_PATH_TEMPLATES else "llm")
+    if not reply_policy.use_template([intent["name"]], style, llm_pool.load()):
+        # Still saves the tool-selection call; only the phrasing goes to the LLM
+        try:
+            with span("llm_phrasing"):
+                response = complete(
+                    model=MODEL,
+                    messages=fallback_messages(user_message, result),
+                    temperature=0.8,
+                    max_tokens=200
+                )
+            final_message = response.choices[0].message.content
+        except:
+            pass
+    final_message = final_message or render_reply(intent["name"], result)
     
+    fast_path_router.record_fast_path(intent, time.perf_counter() - start)
+    return final_message, [result]
+
+def answer_turn(user_message, messages, reply_style=None, conversation_history=(), tool_args=None):
+    """Run the LLM (and any tools it asks for) for one turn.
+
+    `tool_args` is the turn's select_tools() result, when the caller already
+    has it. Returns (final_message, tool_calls_info).
+    """
+    if tool_args is None:
+        tool_args = select_tools(user_message)
     tool_calls_info = []
     final_message = ""
     
     # Try Groq function calling first
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=300,
-            tools=tools,
-            tool_choice="auto"
-        )
+        with span("llm_tool_selection"):
+            response = complete(
+                model=MODEL,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=300,
+                **tool_args
+            )
         
         response_message = response.choices[0].message
         
         if hasattr(response_message, 'tool_calls') and response_message.tool_calls:
-            print(f"✅ Groq tool calling succeeded")
-            
-            messages.append({
-                "role": "assistant",
-                "content": response_message.content or "",
-                "tool_calls": [
-                    {
-                        "id": tc.id,
-                        "type": "function",
-                        "function": {"name": tc.function.name, "arguments": tc.function.arguments}
-                    } for tc in response_message.tool_calls
-                ]
-            })
+            log.info("✅ Groq tool calling succeeded", tools=[tc.function.name for tc in response_message.tool_calls])
             
-            for tool_call in response_message.tool_calls:
-                func_name = tool_call.function.name
-                func_args = json.loads(tool_call.function.arguments)
-                
-                print(f"  → {func_name}: {func_args}")
-                
-                if func_name in available_functions:
-                    result = available_functions[func_name](**func_args)
-                    print(f"    ✓ {result['output']}")
-                    tool_calls_info.append(result)
-                    
-                    messages.append({
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": func_name,
-                        "content": json.dumps(result)
-                    })
+            tool_calls = parse_tool_calls(response_message)
+            with span("tool_execution"):
+                tool_calls_info = run_tool_calls(tool_calls, response_message.content, messages)
             
-            final_response = client.chat.completions.create(
-                model=MODEL,
-                messages=messages,
-                temperature=0.8,
-                max_tokens=300
-            )
-            
-            final_message = final_response.choices[0].message.content
+            final_message = templated_reply(tool_calls, tool_calls_info, reply_style)
+            if final_message is None:
+                with span("llm_final"):
+                    final_response = complete(
+                        model=MODEL,
+                        messages=messages,
+                        temperature=0.8,
+                        max_tokens=300
+                    )
+                final_message = final_response.choices[0].message.content
+            remember_answer(user_message, conversation_history, tool_calls, tool_calls_info, final_message)
         else:
             final_message = response_message.content or "Hey! How can I help you? 😊"
         
     except Exception as e:
-        print(f"⚠️  Groq function calling failed: {str(e)}")
-        print(f"🔄 Using smart fallback detection...")
+        log.warning("⚠️ Groq function calling failed, using smart fallback detection", error=str(e))
         
         # FALLBACK: Manual detection and execution
-        tool_result = detect_and_execute_tool(user_message)
-        
+        func_name, tool_result = detect_and_execute_tool(user_message)
         if tool_result:
-            print(f"✅ Fallback detected: {tool_result['tool']}")
-            print(f"   Output: {tool_result['output']}")
             tool_calls_info.append(tool_result)
-            
-            # Generate natural response
-            try:
-                prompt = f"User asked: '{user_message}'\n\nTool: {tool_result['tool']}\nResult: {tool_result['output']}\n\nRespond naturally in 2-3 sentences."
-                
-                response = client.chat.completions.create(
-                    model=MODEL,
-                    messages=[
-                        {"role": "system", "content": "You are a friendly AI. Respond naturally based on the tool result."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.8,
-                    max_tokens=200
-                )
-                final_message = response.choices[0].message.content
-            except:
-                final_message = f"Here's what I found: {tool_result['output']}"
-        else:
-            # No tool needed - just chat
+        
+        # Phrase the tool result (or just chat) unless the template is the answer
+        prompt, final_message = fallback_plan(user_message, messages, func_name, tool_result, reply_style)
+        if prompt is not None:
             try:
-                response = client.chat.completions.create(
-                    model=MODEL,
-                    messages=messages,
-                    temperature=0.8,
-                    max_tokens=200
-                )
-                final_message = response.choices[0].message.content
-            except:
-                final_message = "I'm here to help! I have 25+ tools including Wikipedia, calculator, weather, and more. What would you like to know? 😊"
+                with span("llm_fallback"):
+                    response = complete(
+                        model=MODEL,
+                        messages=prompt,
+                        temperature=0.8,
+                        max_tokens=200
+                    )
+                final_message = response.choices[0].message.content or final_message
+            except Exception:
+                pass
     
-    print(f"🤖 Assistant: {final_message}\n")
+    return final_message, tool_calls_info
+
+# ============================================
+# RATE LIMITING & ADMISSION
+# ============================================
+
+# Each chat request can cost two LLM calls and several outbound fetches, so
+# clients get a token bucket (keyed by a known API key, else IP) and the process
+# a cap on requests in flight; over either limit the answer is 429 + Retry-After
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT", "1") == "1"
+rate_limiter = RateLimiter(
+    make_bucket_store(
+        backend=os.environ.get("RATE_LIMIT_BACKEND", "memory"),
+        path=os.environ.get("RATE_LIMIT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ratelimit.db"))
+    ),
+    rate=float(os.environ.get("RATE_LIMIT_RPS", 2)),
+    burst=float(os.environ.get("RATE_LIMIT_BURST", 10))
+) if RATE_LIMIT_ENABLED else None
+admission = AdmissionGate(max_in_flight=int(os.environ.get("CHAT_MAX_IN_FLIGHT", 64)))
+ADMISSION_RETRY_SECONDS = float(os.environ.get("ADMISSION_RETRY_SECONDS", 1))
+
+def api_key_hash(api_key):
+    return hashlib.sha256(api_key.encode()).hexdigest()[:32]
+
+# Only keys listed here get a bucket of their own; anything else a client sends
+# is ignored, or rotating a made-up key would hand out a fresh bucket each time
+RATE_LIMIT_API_KEYS = frozenset(
+    api_key_hash(k.strip()) for k in os.environ.get("RATE_LIMIT_API_KEYS", "").split(",") if k.strip()
+)
+
+def client_key(req):
+    """Bucket key: a hash of the API key when it is a known one, else the client address"""
+    api_key = req.headers.get("X-API-Key") or req.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if api_key and api_key_hash(api_key) in RATE_LIMIT_API_KEYS:
+        return "key:" + api_key_hash(api_key)
+    return "ip:" + (req.remote_addr or "unknown")
+
+def admit(req):
+    """None when the request may run (it then holds an admission slot), else (error, retry_after seconds)"""
+    if rate_limiter:
+        key = client_key(req)
+        retry_after = rate_limiter.check(key)
+        if retry_after:
+            log.warning("🚦 Rate limited", client=key, retry_after=round(retry_after, 2))
+            return "Rate limit exceeded", retry_after
+    if not admission.try_enter():
+        log.warning("🚦 Shedding load", in_flight=admission.in_flight)
+        return "Server busy", ADMISSION_RETRY_SECONDS
+    return None
+
+def too_many_requests(error, retry_after):
+    response = jsonify({"error": error, "retry_after": round(retry_after, 2)})
+    response.status_code = 429
+    response.headers["Retry-After"] = retry_after_header(retry_after)
+    return response
+
+def admitted(view):
+    """Rate-limit and admit a route; the slot is held until the response (streams included) is closed"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        rejection = admit(request)
+        if rejection:
+            return too_many_requests(*rejection)
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        except BaseException:
+            admission.leave()
+            raise
+        response.call_on_close(admission.leave)
+        return response
+    return wrapper
+
+# ============================================
+# FLASK ROUTES
+# ============================================
+
+@app.errorhandler(InvalidConversation)
+def invalid_conversation(e):
+    return jsonify({"error": str(e)}), 400
+
+@app.route('/chat', methods=['POST'])
+@admitted
+def chat():
+    with request_trace("/chat"):
+        return chat_turn(request.json)
+
+def chat_turn(data):
+    user_message = data.get('message', '')
+    with span("load_session"):
+        conversation_id, conversation_history = load_conversation(data)
     
-    new_history = conversation_history + [
-        {"role": "user", "content": user_message},
-        {"role": "assistant", "content": final_message}
-    ]
+    reply_style = data.get('reply_style')
+    
+    log.info("💬 User", message=user_message)
+    
+    answer = cached_answer(user_message, conversation_history) or fast_path_answer(user_message, reply_style)
+    if answer:
+        final_message, tool_calls_info = answer
+    else:
+        start = time.perf_counter()
+        messages = build_messages(user_message, conversation_history, conversation_id)
+        final_message, tool_calls_info = coalesced_answer_turn(user_message, messages, conversation_history, reply_style)
+        fast_path_router.record_llm_turn(time.perf_counter() - start)
+    
+    log.info("🤖 Assistant", response=final_message)
+    
+    with span("save_session"):
+        conversation = save_turn(conversation_id, conversation_history, user_message, final_message)
     
     return jsonify({
         "response": final_message,
         "tool_calls": tool_calls_info,
-        "history": new_history
+        **conversation
     })
 
+def sse(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_completion(**kwargs):
+    """Yield text deltas from a streamed completion"""
+    stream = complete(stream=True, **kwargs)
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+@app.route('/chat/stream', methods=['POST'])
+@admitted
+def chat_stream():
+    """Same as /chat, but streams tool results and then the answer token by token.
+
+    Events: `tool_calls` (list of tool results), `token` ({"content": delta}),
+    `done` ({"response"} plus "conversation_id", or "history" for stateless clients).
+    """
+    data = request.json
+    user_message = data.get('message', '')
+    reply_style = data.get('reply_style')
+    conversation_id, conversation_history = load_conversation(data)
+    
+    def generate():
+        with request_trace("/chat/stream"):
+            log.info("💬 User (stream)", message=user_message)
+            yield from generate_turn()
+    
+    def generate_turn():
+        answer = cached_answer(user_message, conversation_history) or fast_path_answer(user_message, reply_style)
+        if answer:
+            final_message, tool_calls_info = answer
+            if tool_calls_info:
+                yield sse("tool_calls", tool_calls_info)
+            yield sse("token", {"content": final_message})
+            yield sse("done", {
+                "response": final_message,
+                **save_turn(conversation_id, conversation_history, user_message, final_message)
+            })
+            return
+        
+        messages = build_messages(user_message, conversation_history, conversation_id)
+        parts = []
+        
+        try:
+            # Stream the first completion too, so small talk starts rendering immediately
+            with span("llm_tool_selection"):
+                stream = complete(
+                    model=MODEL,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=300,
+                    stream=True,
+                    **select_tools(user_message)
+                )
+                
+                tool_calls = {}
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    if delta.content:
+                        parts.append(delta.content)
+                        yield sse("token", {"content": delta.content})
+                    for tc in delta.tool_calls or []:
+                        merge_tool_call_delta(tool_calls, tc)
+            
+            if tool_calls:
+                log.info("✅ Groq tool calling succeeded", tools=[tc["name"] for tc in tool_calls.values()])
+                
+                content = "".join(parts)
+                parts = []
+                tool_calls = [tool_calls[i] for i in sorted(tool_calls)]
+                with span("tool_execution"):
+                    tool_calls_info = run_tool_calls(tool_calls, content, messages)
+                yield sse("tool_calls", tool_calls_info)
+                
+                reply = templated_reply(tool_calls, tool_calls_info, reply_style)
+                if reply is not None:
+                    parts.append(reply)
+                    yield sse("token", {"content": reply})
+                else:
+                    with span("llm_final"):
+                        for delta in stream_completion(model=MODEL, messages=messages, temperature=0.8, max_tokens=300):
+                            parts.append(delta)
+                            yield sse("token", {"content": delta})
+                remember_answer(user_message, conversation_history, tool_calls, tool_calls_info, "".join(parts))
+            elif not parts:
+                parts.append("Hey! How can I help you? 😊")
+                yield sse("token", {"content": parts[0]})
+        
+        except Exception as e:
+            log.warning("⚠️ Groq function calling failed, using smart fallback detection", error=str(e))
+            
+            # Drop anything already streamed; the fallback produces a fresh answer
+            if parts:
+                yield sse("reset", {})
+            parts = []
+            
+            func_name, tool_result = detect_and_execute_tool(user_message)
+            if tool_result:
+                yield sse("tool_calls", [tool_result])
+            fallback_prompt, default = fallback_plan(user_message, messages, func_name, tool_result, reply_style)
+            
+            try:
+                if fallback_prompt is not None:
+                    with span("llm_fallback"):
+                        for delta in stream_completion(model=MODEL, messages=fallback_prompt, temperature=0.8, max_tokens=200):
+                            parts.append(delta)
+                            yield sse("token", {"content": delta})
+            except:
+                if parts:
+                    yield sse("reset", {})
+                parts = []
+            if not parts:
+                parts = [default]
+                yield sse("token", {"content": default})
+        
+        final_message = "".join(parts)
+        log.info("🤖 Assistant", response=final_message)
+        
+        yield sse("done", {
+            "response": final_message,
+            **save_turn(conversation_id, conversation_history, user_message, final_message)
+        })
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Health checks arrive from every load balancer and probe; the stats behind them
+# are cheap but not free, so the serialized body is reused for a short while
+HEALTH_CACHE_SECONDS = float(os.environ.get("HEALTH_CACHE_SECONDS", 1))
+HEALTH_STATIC = {
+    "status": "ok",
+    "model": MODEL,
+    "total_tools": len(available_functions),
+    "tools": list(available_functions.keys()),
+}
+_health_cache = (0.0, None)  # (expires, body)
+
+def health_stats():
+    """Everything /health reports besides HEALTH_STATIC and the coalescing count; async_app reports the same"""
+    return dict(
+        caches={
+            "wikipedia": wikipedia_cache.stats(),
+            "responses": response_cache.stats() if RESPONSE_CACHE_ENABLED else None,
+            "context_summaries": context_window.stats()
+        },
+        fast_path=fast_path_router.stats(),
+        tool_selection=tool_selector.stats(),
+        sandbox=sandbox.stats() if sandbox else None,
+        rate_limit=rate_limiter.stats() if rate_limiter else None,
+        admission=admission.stats(),
+        llm=llm_pool.stats(),
+        replies=reply_policy.stats(),
+        logging=logs.stats()
+    )
+
+def health_body():
+    global _health_cache
+    expires, body = _health_cache
+    now = time.monotonic()
+    if body is None or now >= expires:
+        body = json.dumps(dict(HEALTH_STATIC, coalesced_turns=turn_flight.coalesced, **health_stats()))
+        _health_cache = (now + HEALTH_CACHE_SECONDS, body)
+    return body
+
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({
-        "status": "ok",
-        "model": MODEL,
-        "total_tools": len(available_functions),
-        "tools": list(available_functions.keys())
-    })
+    return Response(health_body(), mimetype='application/json')
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Stage and tool latency histograms in the Prometheus text format.
+
+    `?format=json` returns count, mean and estimated p50/p90/p99 per stage and tool instead.
+    """
+    if request.args.get('format') == 'json':
+        return jsonify(render_json())
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+TOOL_CATEGORIES = tool_registry.categories()
+TOOLS_JSON = json.dumps(TOOL_CATEGORIES)  # static, so serialized once
+
+# Network-bound tools overlap on their own small pool, so batches can't starve the
+# tool calls of chat turns. Sandboxed tools go through tool_executor like a chat
+# turn's, so they use every sandbox worker instead of one at a time. Everything
+# else is cheap CPU work that runs inline, where a thread hop would cost more
+# than the call itself
+BATCH_MAX_CALLS = int(os.environ.get("BATCH_MAX_CALLS", 10000))
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", 4))
+BATCH_PARALLEL_TOOLS = tool_registry.names("parallel")
+BATCH_SANDBOXED_TOOLS = tool_registry.names("cpu_bound") if sandbox else frozenset()
+
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch")
+
+def batch_pool(name):
+    """The executor a batch call runs on, or None to run it inline"""
+    if name in BATCH_PARALLEL_TOOLS:
+        return batch_executor
+    if name in BATCH_SANDBOXED_TOOLS:
+        return tool_executor
+    return None
+
+def batch_line(index, name, result=None, error=None):
+    item = {"index": index, "name": name}
+    if error is None:
+        item["result"] = result
+    else:
+        item["error"] = error
+    try:
+        # Infinity/NaN would make the line invalid JSON for every NDJSON reader
+        return json.dumps(item, allow_nan=False) + "\n"
+    except ValueError:
+        return json.dumps({"index": index, "name": name, "error": "Result is not a finite number"}) + "\n"
+
+def batch_calls(data):
+    """The list of calls in a /tools/batch body, or an error message"""
+    calls = data.get('calls') if isinstance(data, dict) else data
+    if not isinstance(calls, list):
+        return "Expected {\"calls\": [{\"name\": ..., \"arguments\": {...}}]}"
+    if len(calls) > BATCH_MAX_CALLS:
+        return f"Too many calls (max {BATCH_MAX_CALLS})"
+    return calls
+
+def parse_batch_call(call):
+    """(name, arguments, error) for one entry of a batch"""
+    name = call.get("name") if isinstance(call, dict) else None
+    if name not in available_functions:
+        return name, None, f"Unknown tool: {name}"
+    func_args = call.get("arguments") or {}
+    if isinstance(func_args, str):
+        try:
+            func_args = json.loads(func_args)
+        except ValueError:
+            return name, None, "Invalid arguments: not valid JSON"
+    if not isinstance(func_args, dict):
+        return name, None, "Invalid arguments: expected an object"
+    return name, func_args, None
+
+def run_batch_call(index, name, func_args):
+    try:
+        return batch_line(index, name, available_functions[name](**func_args))
+    except Exception as e:
+        return batch_line(index, name, error=str(e))
+
+@app.route('/tools/batch', methods=['POST'])
+@admitted
+def batch_tools():
+    """Run many tool calls without the LLM, streaming one NDJSON line per call.
+
+    Body: {"calls": [{"name": ..., "arguments": {...}}, ...]}. Lines carry the
+    call's index and either "result" or "error", in completion order.
+    """
+    calls = batch_calls(request.json)
+    if isinstance(calls, str):
+        return jsonify({"error": calls}), 400
+    
+    def deadline(name, started, now):
+        # Calls still queued behind other batches can't time out before they start
+        return (started[0] if started else now) + tool_timeout(name)
+    
+    def collect(pending, keep):
+        """Yield finished pooled calls until at most `keep` are still pending"""
+        while len(pending) > keep:
+            now = time.monotonic()
+            next_deadline = min(deadline(name, started, now) for _, name, started in pending.values())
+            done, _ = wait(list(pending), timeout=max(0, next_deadline - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                index, name, _ = pending.pop(future)
+                try:
+                    yield batch_line(index, name, future.result())
+                except Exception as e:
+                    yield batch_line(index, name, error=str(e))
+            now = time.monotonic()
+            for future, (index, name, started) in list(pending.items()):
+                if started and deadline(name, started, now) <= now:
+                    del pending[future]
+                    future.cancel()
+                    yield batch_line(index, name, error=f"Timed out after {tool_timeout(name)}s")
+    
+    def generate():
+        pending = {}
+        for index, call in enumerate(calls):
+            name, func_args, error = parse_batch_call(call)
+            if error:
+                yield batch_line(index, name, error=error)
+                continue
+            
+            executor = batch_pool(name)
+            if executor:
+                started = []
+                future = submit_in_context(executor, run_started, started, available_functions[name], func_args)
+                pending[future] = (index, name, started)
+                # Bound in-flight work so a huge batch can't queue everything at once
+                yield from collect(pending, keep=BATCH_WORKERS)
+            else:
+                yield run_batch_call(index, name, func_args)
+        
+        yield from collect(pending, keep=0)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 @app.route('/tools', methods=['GET'])
 def list_tools():
     """List all available tools"""
-    tool_categories = {
-        "Time & Date": ["get_time", "calculate_age", "days_until"],
-        "Math": ["calculator", "is_prime", "factorial", "fibonacci"],
-        "Information": ["get_weather", "search_wikipedia", "get_random_fact", "get_joke", "get_quote"],
-        "Text": ["count_words", "reverse_text", "text_to_uppercase", "text_to_lowercase"],
-        "Conversion": ["convert_currency", "convert_temperature", "encode_base64", "decode_base64"],
-        "Random/Fun": ["roll_dice", "flip_coin", "generate_password", "random_number", "magic_8ball"]
-    }
-    return jsonify(tool_categories)
+    return Response(TOOLS_JSON, mimetype='application/json')
 
 if __name__ == '__main__':
     print("\n" + "="*60)
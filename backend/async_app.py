@@ -0,0 +1,523 @@
+"""Async (ASGI) serving mode for the chatbot.
+
+Same routes and tools as app.py, but the LLM client and Wikipedia lookups use
+asyncio, so a single process can hold hundreds of in-flight conversations
+instead of one per worker thread.
+
+Run with:
+    hypercorn async_app:app --bind 0.0.0.0:5000
+"""
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+import httpx
+from quart import Quart, Response, request, jsonify
+from quart_cors import cors
+
+import app as chatbot
+from cache import AsyncSingleFlight
+import http_pool
+import metrics
+from metrics import TOOL_SECONDS, request_trace, span
+from ratelimit import retry_after_header
+from registry import ToolArgumentError
+from sessions import InvalidConversation
+
+app = cors(Quart(__name__))
+
+async def complete(**kwargs):
+    """Async twin of chatbot.complete, on the same provider pool and breakers"""
+    return await chatbot.llm_pool.acomplete(**kwargs)
+
+# Same pool sizing and per-host cap as the sync http_pool session
+http = httpx.AsyncClient(
+    headers=chatbot.WIKIPEDIA_HEADERS,
+    timeout=10,
+    transport=httpx.AsyncHTTPTransport(
+        retries=http_pool.RETRIES,  # httpx retries connection failures only
+        limits=httpx.Limits(
+            max_connections=http_pool.POOL_CONNECTIONS * http_pool.POOL_MAXSIZE,
+            max_keepalive_connections=http_pool.POOL_MAXSIZE
+        )
+    )
+)
+
+host_slots = {}
+
+async def http_get(url):
+    host = urlsplit(url).netloc
+    slots = host_slots.setdefault(host, asyncio.Semaphore(http_pool.PER_HOST_LIMIT))
+    async with slots:
+        return await http.get(url)
+
+# ============================================
+# ASYNC TOOLS
+# ============================================
+
+async def fetch_wikipedia(query):
+    formatted_query = "_".join(word.capitalize() for word in query.strip().split())
+    response = await http_get(chatbot.WIKIPEDIA_SUMMARY_URL.format(formatted_query))
+
+    if response.status_code == 200:
+        result = chatbot.summarize_wikipedia_page(query, response.json())
+        return result or chatbot.wikipedia_result(query, "No information found", False)
+
+    elif response.status_code == 404:
+        for alt_query in chatbot.wikipedia_alternatives(query):
+            response_alt = await http_get(chatbot.WIKIPEDIA_SUMMARY_URL.format(alt_query))
+            if response_alt.status_code == 200:
+                result = chatbot.summarize_wikipedia_page(query, response_alt.json(), check_disambiguation=False)
+                if result:
+                    return result
+
+        return chatbot.wikipedia_result(query, f"No Wikipedia article found for '{query}'", False)
+
+    else:
+        raise chatbot.WikipediaError(f"Wikipedia returned error {response.status_code}")
+
+# In-flight lookups by normalized query, so concurrent identical searches share one fetch
+wikipedia_inflight = {}
+
+async def search_wikipedia(query):
+    key = chatbot.normalize_wikipedia_query(query)
+    try:
+        result = chatbot.wikipedia_cache.get(key)
+        if result is None:
+            task = wikipedia_inflight.get(key)
+            if task is None:
+                task = wikipedia_inflight[key] = asyncio.ensure_future(fetch_wikipedia(query))
+                task.add_done_callback(lambda _: wikipedia_inflight.pop(key, None))
+            result = await asyncio.shield(task)
+            chatbot.wikipedia_cache.set(key, result, negative=not result["success"])
+        return dict(result, input=query)
+
+    except httpx.TimeoutException:
+        return chatbot.wikipedia_result(query, "Wikipedia request timed out. Please try again.", False)
+    except chatbot.WikipediaError as e:
+        return chatbot.wikipedia_result(query, str(e), False)
+    except Exception as e:
+        chatbot.tool_log.error("❌ Wikipedia error", query=query, error=str(e))
+        return chatbot.wikipedia_result(query, f"Search error: {str(e)}", False)
+
+# Tools with a native async implementation; everything else is CPU-light and
+# runs in the default thread pool so it never blocks the event loop
+async_functions = {
+    "search_wikipedia": search_wikipedia,
+}
+
+async def call_async_tool(func_name, func_args):
+    # Sync tools are validated and timed by the wrapper in chatbot.available_functions
+    func_args = chatbot.tool_registry.tools[func_name].validate(func_args)
+    with span("tool", histogram=TOOL_SECONDS, tool=func_name):
+        return await async_functions[func_name](**func_args)
+
+async def call_tool(func_name, func_args):
+    if not isinstance(func_args, dict):
+        return chatbot.tool_error_result(func_name, func_args, f"Invalid arguments for {func_name}: not valid JSON")
+    if func_name in async_functions:
+        call = call_async_tool(func_name, func_args)
+    else:
+        call = asyncio.to_thread(chatbot.available_functions[func_name], **func_args)
+    try:
+        return await asyncio.wait_for(call, timeout=chatbot.tool_timeout(func_name))
+    except asyncio.TimeoutError:
+        return chatbot.tool_timeout_result(func_name, func_args)
+    except ToolArgumentError as e:
+        chatbot.tool_log.warning("⚠️ Invalid tool arguments", tool=func_name, error=str(e))
+        return chatbot.tool_error_result(func_name, func_args, str(e))
+
+async def run_tool_calls(tool_calls, content, messages):
+    """Async twin of chatbot.run_tool_calls: run the calls concurrently, append the results to messages"""
+    messages.append(chatbot.tool_calls_message(tool_calls, content))
+
+    calls = []
+    for tool_call in tool_calls:
+        func_name = tool_call["name"]
+        if func_name in chatbot.available_functions:
+            try:
+                func_args = json.loads(tool_call["arguments"] or "{}")
+            except ValueError:
+                func_args = tool_call["arguments"]  # reported back by call_tool
+            calls.append((tool_call, func_name, func_args))
+
+    # gather() preserves call order, so messages match the sync app
+    results = await asyncio.gather(*(call_tool(name, args) for _, name, args in calls))
+
+    for (tool_call, func_name, _), result in zip(calls, results):
+        messages.append(chatbot.tool_result_message(tool_call, func_name, result))
+    return list(results)
+
+async def stream_completion(**kwargs):
+    """Yield text deltas from a streamed completion"""
+    stream = await complete(stream=True, **kwargs)
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+# Identical no-history turns share one answer; see chatbot.coalesce_key for the policy
+turn_flight = AsyncSingleFlight()
+
+async def detect_and_execute_tool(user_message):
+    # The fallback rules may hit Wikipedia through the blocking client; returns (func_name, result)
+    return await asyncio.to_thread(chatbot.detect_and_execute_tool, user_message)
+
+# ============================================
+# ROUTES
+# ============================================
+
+@app.errorhandler(InvalidConversation)
+async def invalid_conversation(e):
+    return jsonify({"error": str(e)}), 400
+
+async def rejected():
+    """A 429 response when the request is over its limits, else None and it holds an admission slot"""
+    # Same buckets and in-flight cap as the sync app; the SQLite backend may block briefly
+    rejection = await asyncio.to_thread(chatbot.admit, request)
+    if rejection:
+        error, retry_after = rejection
+        response = jsonify({"error": error, "retry_after": round(retry_after, 2)})
+        return response, 429, {"Retry-After": retry_after_header(retry_after)}
+    return None
+
+async def admitted_stream(body):
+    """Yield from an async response body, giving back the admission slot once it is done"""
+    try:
+        async for item in body:
+            yield item
+    finally:
+        chatbot.admission.leave()
+
+@app.route('/chat', methods=['POST'])
+async def chat():
+    rejection = await rejected()
+    if rejection:
+        return rejection
+    try:
+        data = await request.get_json()
+        with request_trace("/chat"):
+            return await chat_turn(data)
+    finally:
+        chatbot.admission.leave()
+
+async def chat_turn(data):
+    user_message = data.get('message', '')
+    reply_style = data.get('reply_style')
+    with span("load_session"):
+        conversation_id, conversation_history = chatbot.load_conversation(data)
+
+    chatbot.log.info("💬 User", message=user_message)
+
+    answer = chatbot.cached_answer(user_message, conversation_history) or await asyncio.to_thread(chatbot.fast_path_answer, user_message, reply_style)
+    if answer:
+        final_message, tool_calls_info = answer
+    else:
+        start = time.perf_counter()
+        # May call the LLM to refresh a stale summary, so keep it off the event loop
+        messages = await asyncio.to_thread(chatbot.build_messages, user_message, conversation_history, conversation_id)
+
+        tool_args = chatbot.select_tools(user_message)
+        key = chatbot.coalesce_key(user_message, messages, conversation_history, reply_style, tool_args)
+        if key is None:
+            final_message, tool_calls_info = await answer_turn(user_message, messages, reply_style, conversation_history, tool_args)
+        else:
+            final_message, tool_calls_info = await turn_flight.do(key, lambda: answer_turn(user_message, messages, reply_style, conversation_history, tool_args))
+        chatbot.fast_path_router.record_llm_turn(time.perf_counter() - start)
+
+    chatbot.log.info("🤖 Assistant", response=final_message)
+
+    return jsonify({
+        "response": final_message,
+        "tool_calls": tool_calls_info,
+        **chatbot.save_turn(conversation_id, conversation_history, user_message, final_message)
+    })
+
+async def answer_turn(user_message, messages, reply_style=None, conversation_history=(), tool_args=None):
+    """Run the LLM (and any tools it asks for) for one turn; returns (final_message, tool_calls_info)"""
+    if tool_args is None:
+        tool_args = chatbot.select_tools(user_message)
+    tool_calls_info = []
+    final_message = ""
+
+    try:
+        with span("llm_tool_selection"):
+            response = await complete(
+                model=chatbot.MODEL,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=300,
+                **tool_args
+            )
+
+        response_message = response.choices[0].message
+
+        if response_message.tool_calls:
+            chatbot.log.info("✅ Groq tool calling succeeded", tools=[tc.function.name for tc in response_message.tool_calls])
+
+            tool_calls = chatbot.parse_tool_calls(response_message)
+            with span("tool_execution"):
+                tool_calls_info = await run_tool_calls(tool_calls, response_message.content, messages)
+
+            final_message = chatbot.templated_reply(tool_calls, tool_calls_info, reply_style)
+            if final_message is None:
+                with span("llm_final"):
+                    final_response = await complete(
+                        model=chatbot.MODEL,
+                        messages=messages,
+                        temperature=0.8,
+                        max_tokens=300
+                    )
+                final_message = final_response.choices[0].message.content
+            chatbot.remember_answer(user_message, conversation_history, tool_calls, tool_calls_info, final_message)
+        else:
+            final_message = response_message.content or "Hey! How can I help you? 😊"
+
+    except Exception as e:
+        chatbot.log.warning("⚠️ Groq function calling failed, using smart fallback detection", error=str(e))
+
+        func_name, tool_result = await detect_and_execute_tool(user_message)
+        if tool_result:
+            tool_calls_info.append(tool_result)
+
+        prompt, final_message = chatbot.fallback_plan(user_message, messages, func_name, tool_result, reply_style)
+        if prompt is not None:
+            try:
+                with span("llm_fallback"):
+                    response = await complete(
+                        model=chatbot.MODEL,
+                        messages=prompt,
+                        temperature=0.8,
+                        max_tokens=200
+                    )
+                final_message = response.choices[0].message.content or final_message
+            except Exception:
+                pass
+
+    return final_message, tool_calls_info
+
+@app.route('/chat/stream', methods=['POST'])
+async def chat_stream():
+    """Same as /chat, but streams server-sent events; see chatbot.chat_stream for the events"""
+    rejection = await rejected()
+    if rejection:
+        return rejection
+    try:
+        data = await request.get_json()
+        conversation_id, conversation_history = chatbot.load_conversation(data)
+    except BaseException:
+        chatbot.admission.leave()
+        raise
+
+    async def generate():
+        with request_trace("/chat/stream"):
+            chatbot.log.info("💬 User (stream)", message=data.get('message', ''))
+            async for event in generate_turn(data, conversation_id, conversation_history):
+                yield event
+
+    return Response(
+        admitted_stream(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+async def generate_turn(data, conversation_id, conversation_history):
+    sse = chatbot.sse
+    user_message = data.get('message', '')
+    reply_style = data.get('reply_style')
+
+    answer = chatbot.cached_answer(user_message, conversation_history) or await asyncio.to_thread(chatbot.fast_path_answer, user_message, reply_style)
+    if answer:
+        final_message, tool_calls_info = answer
+        if tool_calls_info:
+            yield sse("tool_calls", tool_calls_info)
+        yield sse("token", {"content": final_message})
+        yield sse("done", {
+            "response": final_message,
+            **chatbot.save_turn(conversation_id, conversation_history, user_message, final_message)
+        })
+        return
+
+    messages = await asyncio.to_thread(chatbot.build_messages, user_message, conversation_history, conversation_id)
+    parts = []
+
+    try:
+        # Stream the first completion too, so small talk starts rendering immediately
+        with span("llm_tool_selection"):
+            stream = await complete(
+                model=chatbot.MODEL,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=300,
+                stream=True,
+                **chatbot.select_tools(user_message)
+            )
+
+            tool_calls = {}
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    parts.append(delta.content)
+                    yield sse("token", {"content": delta.content})
+                for tc in delta.tool_calls or []:
+                    chatbot.merge_tool_call_delta(tool_calls, tc)
+
+        if tool_calls:
+            chatbot.log.info("✅ Groq tool calling succeeded", tools=[tc["name"] for tc in tool_calls.values()])
+
+            content = "".join(parts)
+            parts = []
+            tool_calls = [tool_calls[i] for i in sorted(tool_calls)]
+            with span("tool_execution"):
+                tool_calls_info = await run_tool_calls(tool_calls, content, messages)
+            yield sse("tool_calls", tool_calls_info)
+
+            reply = chatbot.templated_reply(tool_calls, tool_calls_info, reply_style)
+            if reply is not None:
+                parts.append(reply)
+                yield sse("token", {"content": reply})
+            else:
+                with span("llm_final"):
+                    async for delta in stream_completion(model=chatbot.MODEL, messages=messages, temperature=0.8, max_tokens=300):
+                        parts.append(delta)
+                        yield sse("token", {"content": delta})
+            chatbot.remember_answer(user_message, conversation_history, tool_calls, tool_calls_info, "".join(parts))
+        elif not parts:
+            parts.append("Hey! How can I help you? 😊")
+            yield sse("token", {"content": parts[0]})
+
+    except Exception as e:
+        chatbot.log.warning("⚠️ Groq function calling failed, using smart fallback detection", error=str(e))
+
+        # Drop anything already streamed; the fallback produces a fresh answer
+        if parts:
+            yield sse("reset", {})
+        parts = []
+
+        func_name, tool_result = await detect_and_execute_tool(user_message)
+        if tool_result:
+            yield sse("tool_calls", [tool_result])
+        fallback_prompt, default = chatbot.fallback_plan(user_message, messages, func_name, tool_result, reply_style)
+
+        try:
+            if fallback_prompt is not None:
+                with span("llm_fallback"):
+                    async for delta in stream_completion(model=chatbot.MODEL, messages=fallback_prompt, temperature=0.8, max_tokens=200):
+                        parts.append(delta)
+                        yield sse("token", {"content": delta})
+        except Exception:
+            if parts:
+                yield sse("reset", {})
+            parts = []
+        if not parts:
+            parts = [default]
+            yield sse("token", {"content": default})
+
+    final_message = "".join(parts)
+    chatbot.log.info("🤖 Assistant", response=final_message)
+
+    yield sse("done", {
+        "response": final_message,
+        **chatbot.save_turn(conversation_id, conversation_history, user_message, final_message)
+    })
+
+HEALTH_STATIC = dict(chatbot.HEALTH_STATIC, mode="async")
+_health_cache = (0.0, None)  # (expires, body)
+
+@app.route('/health', methods=['GET'])
+async def health():
+    global _health_cache
+    expires, body = _health_cache
+    now = time.monotonic()
+    if body is None or now >= expires:
+        body = json.dumps(dict(HEALTH_STATIC, coalesced_turns=turn_flight.coalesced, **chatbot.health_stats()))
+        _health_cache = (now + chatbot.HEALTH_CACHE_SECONDS, body)
+    return Response(body, mimetype='application/json')
+
+@app.route('/metrics', methods=['GET'])
+async def metrics_endpoint():
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.render_json())
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+# Shared by every batch, like the sync app's batch pools, so batches can't crowd out chat turns
+batch_slots = asyncio.Semaphore(chatbot.BATCH_WORKERS)
+
+async def run_batch_call(index, name, func_args):
+    """One batch line; the timeout starts when the call does"""
+    if name in async_functions:
+        call = call_async_tool(name, func_args)
+    else:
+        call = asyncio.to_thread(chatbot.available_functions[name], **func_args)
+    try:
+        result = await asyncio.wait_for(call, timeout=chatbot.tool_timeout(name))
+    except asyncio.TimeoutError:
+        return chatbot.batch_line(index, name, error=f"Timed out after {chatbot.tool_timeout(name)}s")
+    except Exception as e:
+        return chatbot.batch_line(index, name, error=str(e))
+    return chatbot.batch_line(index, name, result)
+
+async def run_pooled_batch_call(index, name, func_args):
+    async with batch_slots:
+        return await run_batch_call(index, name, func_args)
+
+async def batch_lines(calls):
+    pending = set()
+    try:
+        for index, call in enumerate(calls):
+            name, func_args, error = chatbot.parse_batch_call(call)
+            if error:
+                yield chatbot.batch_line(index, name, error=error)
+                continue
+
+            if chatbot.batch_pool(name):
+                pending.add(asyncio.ensure_future(run_pooled_batch_call(index, name, func_args)))
+                # Bound in-flight work so a huge batch can't queue everything at once
+                while len(pending) > chatbot.BATCH_WORKERS:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+            else:
+                yield await run_batch_call(index, name, func_args)
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+@app.route('/tools/batch', methods=['POST'])
+async def batch_tools():
+    """Async twin of chatbot.batch_tools: same body, same NDJSON lines in completion order"""
+    rejection = await rejected()
+    if rejection:
+        return rejection
+    try:
+        calls = chatbot.batch_calls(await request.get_json())
+    except BaseException:
+        chatbot.admission.leave()
+        raise
+    if isinstance(calls, str):
+        chatbot.admission.leave()
+        return jsonify({"error": calls}), 400
+
+    response = Response(admitted_stream(batch_lines(calls)), mimetype='application/x-ndjson')
+    response.timeout = None  # a big batch can outlast RESPONSE_TIMEOUT; every call has its own timeout
+    return response
+
+@app.route('/tools', methods=['GET'])
+async def list_tools():
+    """List all available tools"""
+    return Response(chatbot.TOOLS_JSON, mimetype='application/json')
+
+@app.after_serving
+async def close_clients():
+    await http.aclose()
+    await chatbot.llm_pool.aclose()
+
+if __name__ == '__main__':
+    app.run(port=5000, host='0.0.0.0')
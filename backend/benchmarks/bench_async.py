@@ -0,0 +1,99 @@
+"""Compare concurrent /chat throughput of the sync (WSGI) and async (ASGI) apps.
+
+Both servers talk to the local LLM stub, so the only difference is how they
+wait on I/O. The sync app runs under gunicorn with a fixed number of worker
+threads (how it is deployed); the async app runs in a single hypercorn process.
+
+    python benchmarks/bench_async.py --concurrency 50 --requests 500
+
+Requires gunicorn and hypercorn in addition to the app's own dependencies.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import llm_stub
+
+def start_server(cmd, port, env):
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"server did not start: {' '.join(cmd)}")
+
+async def drive(url, concurrency, total):
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker(http):
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            response = await http.post(url, json={"message": "hello there", "history": []})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.3, help="stub LLM latency in seconds")
+    parser.add_argument("--sync-workers", type=int, default=2)
+    parser.add_argument("--sync-threads", type=int, default=8)
+    args = parser.parse_args()
+
+    stub_port, sync_port, async_port = 8001, 8002, 8003
+    stub = llm_stub.serve(stub_port, args.latency, background=True)
+
+    # The load repeats the same few messages; coalescing would answer most of them without the stub
+    env = dict(os.environ, LLM_BASE_URL=f"http://127.0.0.1:{stub_port}/v1", RATE_LIMIT="0", COALESCE="0",
+               PYTHONUNBUFFERED="1")
+    servers = {
+        "sync": (["gunicorn", "-w", str(args.sync_workers), "--threads", str(args.sync_threads),
+                  "-b", f"127.0.0.1:{sync_port}", "app:app"], sync_port),
+        "async": (["hypercorn", "-b", f"127.0.0.1:{async_port}", "async_app:app"], async_port),
+    }
+
+    print(f"📊 {args.requests} requests, concurrency {args.concurrency}, stub latency {args.latency}s")
+    for name, (cmd, port) in servers.items():
+        proc = start_server(cmd, port, env)
+        try:
+            result = asyncio.run(drive(f"http://127.0.0.1:{port}/chat", args.concurrency, args.requests))
+        finally:
+            proc.terminate()
+            proc.wait()
+        print(f"  {name:>5}: {result['throughput']:7.1f} req/s   p50 {result['p50'] * 1000:7.1f} ms   p99 {result['p99'] * 1000:7.1f} ms")
+
+    stub.shutdown()
+
+if __name__ == '__main__':
+    main()
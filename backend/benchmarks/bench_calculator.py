@@ -0,0 +1,54 @@
+"""Throughput of the calculator on repeated expressions.
+
+    python benchmarks/bench_calculator.py
+
+Compares the old sandboxed eval() with expr.evaluate, both with a warm
+compile cache (the common case: the same expressions keep coming back) and
+with the cache bypassed.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import expr
+
+EXPRESSIONS = [
+    "2+2", "25*4", "12*7", "100/7", "(3+4)*2 - 1", "2**10", "17 % 5", "1/3 + 1/6",
+    "sqrt(144) + 3", "round(pi * 10 ** 2, 2)", "(1 + 2) * (3 + 4) * (5 + 6)", "1e6 / 365",
+]
+
+def legacy_eval(expression):
+    return eval(expression, {"__builtins__": {}}, {})
+
+def uncached_evaluate(expression):
+    return expr.compile_expression.__wrapped__(expression)()
+
+def bench(fn, number):
+    seconds = timeit.timeit(lambda: [fn(e) for e in EXPRESSIONS], number=number)
+    return number * len(EXPRESSIONS) / seconds
+
+def main(number=5000):
+    # eval() has no sqrt/round/pi, so it only runs the plain-arithmetic subset
+    plain = [e for e in EXPRESSIONS if not any(name in e for name in ("sqrt", "round", "pi"))]
+    for e in plain:
+        assert expr.evaluate(e) == legacy_eval(e), e
+
+    print(f"📊 {len(EXPRESSIONS)} expressions x {number} rounds")
+    legacy = number * len(plain) / timeit.timeit(lambda: [legacy_eval(e) for e in plain], number=number)
+    print(f"  eval() (plain subset):  {legacy:>10,.0f} expr/s")
+    print(f"  expr.evaluate uncached: {bench(uncached_evaluate, number):>10,.0f} expr/s")
+    print(f"  expr.evaluate cached:   {bench(expr.evaluate, number):>10,.0f} expr/s")
+
+    for hostile in ["9**9**9", "10**100000", "2**4096 * 2**4096", "(" * 150 + "1" + ")" * 150]:
+        start = timeit.default_timer()
+        try:
+            expr.evaluate(hostile)
+            outcome = "evaluated"
+        except expr.ExpressionError as e:
+            outcome = f"rejected: {e}"
+        print(f"  {hostile[:24]!r:<28} {outcome} in {(timeit.default_timer() - start) * 1e6:.0f} µs")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,152 @@
+"""Microbenchmark: compiled intent matcher vs the previous linear keyword scans.
+
+    python benchmarks/bench_intent.py
+
+Reports the per-message cost of router.detect_intent and of the scan-based
+matcher it replaced (kept below verbatim for comparison), plus the messages
+on which the two disagree. The compiled matcher also scores how much of the
+message each intent leaves unexplained, which the legacy scans never did, so
+the ratio includes that extra work.
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from router import detect_intent
+
+CORPUS = [
+    "hi", "hello there!", "hey, how are you?", "this is nice", "what time is it?",
+    "what's today's date", "flip a coin", "heads or tails?", "roll a d20", "roll 12 sided dice",
+    "let's roll", "calculate 25*4", "what is 12*7", "compute (3+4)*2 - 1", "solve 100/7",
+    "what is the weather in Chennai", "weather in new york today", "temperature in London",
+    "who is Alan Turing", "tell me about the Eiffel Tower", "search for black holes on wikipedia",
+    "tell me a joke", "make me laugh", "any jokes?", "give me an interesting fact", "trivia please",
+    "inspire me with a quote", "I need motivation", "generate a password of 16 characters",
+    "new password", "magic 8 ball, will it rain?", "ask the 8ball", "is 97 prime?",
+    "is 1000000007 a prime number", "factorial of 10", "what is the factorial of 20",
+    "fibonacci 15", "first 8 fib numbers", "fiber optic cables are fast",
+    "can you help me write an email to my landlord about the broken heater in my flat",
+    "what are the main differences between python and javascript for backend work",
+    "thanks, that was helpful", "goodbye",
+]
+
+def legacy_detect_intent(user_message):
+    """Best {"name", "arguments", "confidence"} for the message, or None"""
+    msg = user_message.lower()
+    candidates = []
+
+    def candidate(name, arguments, confidence):
+        candidates.append({"name": name, "arguments": arguments, "confidence": confidence})
+
+    # Wikipedia
+    if any(word in msg for word in ['who is', 'what is', 'tell me about', 'search for', 'wikipedia', 'who are']):
+        query = re.sub(r'(who is|who are|what is|what are|tell me about|search for|search|wikipedia|on wikipedia|\?)', '', user_message, flags=re.IGNORECASE)
+        query = query.strip()
+        if query:
+            candidate("search_wikipedia", {"query": query}, 0.6)
+
+    # Weather
+    if 'weather' in msg or 'temperature' in msg:
+        cities = ['chennai', 'mumbai', 'delhi', 'bangalore', 'kolkata', 'hyderabad',
+                  'new york', 'london', 'tokyo', 'paris']
+        city = next((c for c in cities if c in msg), None)
+        if city:
+            candidate("get_weather", {"city": city.title()}, 0.85)
+        else:
+            candidate("get_weather", {"city": "Chennai"}, 0.4)
+
+    # Calculator
+    math_pattern = r'[\d\+\-\*/\(\)\.\s]+'
+    if any(word in msg for word in ['calculate', 'compute', 'what is', "what's", 'solve']):
+        matches = re.findall(math_pattern, user_message)
+        if matches:
+            expression = max(matches, key=len).strip()
+            if expression and any(op in expression for op in ['+', '-', '*', '/']):
+                candidate("calculator", {"expression": expression}, 0.9)
+
+    # Time/Date
+    if any(word in msg for word in ['time', 'date', 'today', 'now']):
+        candidate("get_time", {}, 0.7)
+    elif any(word in msg for word in ['hi', 'hello', 'hey']):
+        candidate("get_time", {}, 0.2)  # greetings: the LLM should answer these
+
+    # Joke
+    if any(word in msg for word in ['joke', 'funny', 'laugh', 'humor']):
+        candidate("get_joke", {}, 0.85)
+
+    # Fact
+    if any(word in msg for word in ['fact', 'interesting', 'trivia']):
+        candidate("get_random_fact", {}, 0.8)
+
+    # Quote
+    if any(word in msg for word in ['quote', 'inspire', 'motivation', 'motivate']):
+        candidate("get_quote", {}, 0.8)
+
+    # Dice
+    if 'dice' in msg or 'roll' in msg:
+        sides = 6
+        if '20' in msg:
+            sides = 20
+        elif '12' in msg:
+            sides = 12
+        candidate("roll_dice", {"sides": sides}, 0.9 if 'dice' in msg or re.search(r'\bd\d+\b', msg) else 0.75)
+
+    # Coin
+    if 'coin' in msg or 'flip' in msg or 'heads' in msg or 'tails' in msg:
+        candidate("flip_coin", {}, 0.9 if 'coin' in msg else 0.6)
+
+    # Password
+    if 'password' in msg:
+        numbers = re.findall(r'\d+', user_message)
+        length = int(numbers[0]) if numbers else 12
+        candidate("generate_password", {"length": length}, 0.85)
+
+    # Magic 8 Ball
+    if '8 ball' in msg or 'magic 8' in msg or '8ball' in msg:
+        candidate("magic_8ball", {}, 0.9)
+
+    # Prime
+    if 'prime' in msg:
+        numbers = re.findall(r'\d+', user_message)
+        if numbers:
+            candidate("is_prime", {"number": int(numbers[0])}, 0.9)
+
+    # Factorial
+    if 'factorial' in msg:
+        numbers = re.findall(r'\d+', user_message)
+        if numbers:
+            candidate("factorial", {"number": int(numbers[0])}, 0.9)
+
+    # Fibonacci
+    if 'fibonacci' in msg or 'fib' in msg:
+        numbers = re.findall(r'\d+', user_message)
+        count = int(numbers[0]) if numbers else 10
+        candidate("fibonacci", {"count": count}, 0.85 if 'fibonacci' in msg else 0.6)
+
+    # Highest confidence wins; ties go to the rule listed first
+    return max(candidates, key=lambda c: c["confidence"], default=None)
+
+def bench(fn, number):
+    seconds = timeit.timeit(lambda: [fn(m) for m in CORPUS], number=number)
+    return seconds / (number * len(CORPUS)) * 1e6
+
+def main(number=2000):
+    print(f"📊 {len(CORPUS)} messages x {number} rounds")
+    legacy = bench(legacy_detect_intent, number)
+    compiled = bench(detect_intent, number)
+    print(f"  legacy scans:     {legacy:6.2f} µs/message")
+    print(f"  compiled matcher: {compiled:6.2f} µs/message  ({legacy / compiled:.1f}x)")
+
+    print("\nDifferences (legacy -> compiled):")
+    for message in CORPUS:
+        old, new = legacy_detect_intent(message), detect_intent(message)
+        old_name = old and old["name"]
+        new_name = new and new["name"]
+        if old_name != new_name:
+            print(f"  {message!r}: {old_name} -> {new_name}")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,253 @@
+"""Offline load test for /chat, /health and /tools.
+
+Starts the LLM and Wikipedia stubs, starts the app against them (sync under
+gunicorn or async under hypercorn), then drives a weighted mix of requests at
+each concurrency level and reports throughput, latency percentiles, errors
+and the server's memory use.
+
+    python benchmarks/bench_load.py --concurrency 1,10,50 --requests 500
+    python benchmarks/bench_load.py --server async --mix chat=1 --json after.json --baseline before.json
+
+With --baseline, a level/endpoint whose throughput dropped or whose p99 rose
+by more than --tolerance is reported as a regression and the exit code is 1.
+Use --url to load an already running server instead (memory is then only
+reported if --pid is given). Requires httpx, plus gunicorn or hypercorn.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import llm_stub
+import wikipedia_stub
+from bench_async import start_server
+
+# Chat messages cover small talk, the fast path, LLM tool calls and Wikipedia lookups
+CHAT_MESSAGES = [
+    "hello there",
+    "how are you doing today?",
+    "flip a coin",
+    "roll a d20",
+    "calculate 12*7 please",
+    "what's the weather in Tokyo",
+    "tell me about Alan Turing",
+    "search wikipedia for python",
+    "convert 100 dollars to euros",
+    "is 1000000007 prime?",
+]
+
+ENDPOINTS = {
+    "chat": ("POST", "/chat"),
+    "health": ("GET", "/health"),
+    "tools": ("GET", "/tools"),
+}
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint in --mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else None
+
+def process_tree_rss(pid):
+    """Resident memory (MB) of a process and its children, from /proc; None if unavailable"""
+    try:
+        children = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as f:
+                        ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+                    children.setdefault(ppid, []).append(int(entry))
+                except (OSError, ValueError, IndexError):
+                    continue
+        total, stack = 0, [pid]
+        while stack:
+            current = stack.pop()
+            stack.extend(children.get(current, []))
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        return total / 1024
+    except OSError:
+        return None
+
+async def drive(base_url, mix, concurrency, total, pid=None):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    plan = random.Random(42).choices(names, weights=weights, k=total)
+    queue = asyncio.Queue()
+    for i, name in enumerate(plan):
+        queue.put_nowait((i, name))
+
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    memory = {"start": process_tree_rss(pid) if pid else None, "peak": None}
+
+    async def sample_memory():
+        while True:
+            rss = process_tree_rss(pid)
+            if rss is not None:
+                memory["peak"] = max(memory["peak"] or 0, rss)
+            await asyncio.sleep(0.2)
+
+    async def worker(http):
+        while not queue.empty():
+            i, name = queue.get_nowait()
+            method, path = ENDPOINTS[name]
+            body = {"message": CHAT_MESSAGES[i % len(CHAT_MESSAGES)], "history": []} if method == "POST" else None
+            start = time.perf_counter()
+            try:
+                response = await http.request(method, base_url + path, json=body)
+                response.raise_for_status()
+            except httpx.HTTPError:
+                errors[name] += 1
+                continue
+            latencies[name].append(time.perf_counter() - start)
+
+    sampler = asyncio.ensure_future(sample_memory()) if pid else None
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    if sampler:
+        sampler.cancel()
+    memory["end"] = process_tree_rss(pid) if pid else None
+
+    results = {}
+    for name in names:
+        samples = sorted(latencies[name])
+        results[name] = {
+            "requests": len(samples) + errors[name],
+            "errors": errors[name],
+            "throughput": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(samples, 0.5) * 1000, 2) if samples else None,
+            "p90_ms": round(percentile(samples, 0.9) * 1000, 2) if samples else None,
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 2) if samples else None,
+        }
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "throughput": round(sum(len(v) for v in latencies.values()) / elapsed, 2),
+        "endpoints": results,
+        "memory_mb": {key: round(value, 1) if value is not None else None for key, value in memory.items()},
+    }
+
+def print_level(result):
+    memory = result["memory_mb"]
+    memory_text = f"   rss {memory['start']} → {memory['end']} MB (peak {memory['peak']})" if memory["start"] is not None else ""
+    print(f"\n  concurrency {result['concurrency']}: {result['throughput']:.1f} req/s in {result['seconds']}s{memory_text}")
+    for name, r in result["endpoints"].items():
+        if r["p50_ms"] is None:
+            print(f"    {name:>7}: all {r['requests']} requests failed")
+            continue
+        print(f"    {name:>7}: {r['throughput']:8.1f} req/s   p50 {r['p50_ms']:8.1f} ms   p90 {r['p90_ms']:8.1f} ms"
+              f"   p99 {r['p99_ms']:8.1f} ms   errors {r['errors']}")
+
+def compare(results, baseline, tolerance):
+    """Regressions against a previous --json report"""
+    previous = {level["concurrency"]: level for level in baseline["levels"]}
+    regressions = []
+    for level in results["levels"]:
+        before = previous.get(level["concurrency"])
+        if not before:
+            continue
+        for name, now in level["endpoints"].items():
+            old = before["endpoints"].get(name)
+            if not old or not old["throughput"] or now["p99_ms"] is None:
+                continue
+            if now["throughput"] < old["throughput"] * (1 - tolerance):
+                regressions.append(f"{name} @ {level['concurrency']}: throughput {old['throughput']} → {now['throughput']} req/s")
+            if old["p99_ms"] and now["p99_ms"] > old["p99_ms"] * (1 + tolerance):
+                regressions.append(f"{name} @ {level['concurrency']}: p99 {old['p99_ms']} → {now['p99_ms']} ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--server", choices=["sync", "async"], default="sync")
+    parser.add_argument("--url", help="load an already running server instead of starting one")
+    parser.add_argument("--pid", type=int, help="process to measure memory for when using --url")
+    parser.add_argument("--concurrency", default="1,10,50", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=300, help="requests per concurrency level")
+    parser.add_argument("--mix", default="chat=8,health=1,tools=1", help="endpoint weights")
+    parser.add_argument("--latency", type=float, default=0.3, help="stub LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="stub LLM latency jitter in seconds")
+    parser.add_argument("--wiki-latency", type=float, default=0.05, help="stub Wikipedia latency in seconds")
+    parser.add_argument("--sync-workers", type=int, default=2)
+    parser.add_argument("--sync-threads", type=int, default=8)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="previous --json report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative change before flagging")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    levels = [int(c) for c in args.concurrency.split(",")]
+    stubs, proc = [], None
+    base_url, pid = args.url, args.pid
+
+    if not base_url:
+        llm_port, wiki_port, app_port = 8001, 8004, 8005
+        stubs.append(llm_stub.serve(llm_port, args.latency, background=True, jitter=args.jitter))
+        stubs.append(wikipedia_stub.serve(wiki_port, args.wiki_latency, background=True))
+        env = dict(
+            os.environ,
+            LLM_BASE_URL=f"http://127.0.0.1:{llm_port}/v1",
+            WIKIPEDIA_BASE_URL=f"http://127.0.0.1:{wiki_port}",
+            RATE_LIMIT="0",  # one client driving the whole load; measure the stack, not the limiter
+            COALESCE="0",  # the load repeats a few messages; each request should do its own work
+            PYTHONUNBUFFERED="1"
+        )
+        if args.server == "sync":
+            cmd = ["gunicorn", "-w", str(args.sync_workers), "--threads", str(args.sync_threads),
+                   "-b", f"127.0.0.1:{app_port}", "app:app"]
+        else:
+            cmd = ["hypercorn", "-b", f"127.0.0.1:{app_port}", "async_app:app"]
+        proc = start_server(cmd, app_port, env)
+        base_url, pid = f"http://127.0.0.1:{app_port}", proc.pid
+
+    print(f"📊 {args.server if not args.url else base_url}: {args.requests} requests per level, mix {args.mix}, "
+          f"stub latency {args.latency}s ± {args.jitter}s")
+    report = {"server": args.server, "mix": mix, "latency": args.latency, "levels": []}
+    try:
+        for concurrency in levels:
+            result = asyncio.run(drive(base_url, mix, concurrency, args.requests, pid))
+            print_level(result)
+            report["levels"].append(result)
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+        for stub in stubs:
+            stub.shutdown()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"    {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Minimal OpenAI-compatible chat completions stub for offline benchmarks.
+
+Every request sleeps for a configurable latency (plus optional random jitter)
+and answers with a canned reply, so benchmark numbers measure our serving
+stack rather than the LLM provider. When a request offers tools and the
+latest user message matches one of CANNED_TOOL_CALLS, the stub answers with
+that tool call instead, so the tool-execution and second-completion stages
+are exercised too. Streaming (`stream: true`) is supported.
+
+    python llm_stub.py --port 8001 --latency 0.3 --jitter 0.1
+    LLM_BASE_URL=http://127.0.0.1:8001/v1 python app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_REPLY = "Hello from the stub! 😊"
+
+# (keyword in the user's message, tool name, arguments)
+CANNED_TOOL_CALLS = [
+    ("wikipedia", "search_wikipedia", {"query": "Python (programming language)"}),
+    ("tell me about", "search_wikipedia", {"query": "Alan Turing"}),
+    ("weather", "get_weather", {"city": "Tokyo"}),
+    ("calculate", "calculator", {"expression": "12*7"}),
+    ("convert", "convert_currency", {"amount": 100, "from_currency": "USD", "to_currency": "EUR"}),
+    ("prime", "is_prime", {"number": 1000000007}),
+    ("time", "get_time", {}),
+]
+
+def canned_tool_call(body):
+    """The tool call to answer with, or None for a plain text reply"""
+    messages = body.get("messages") or []
+    if not body.get("tools") or not messages or messages[-1].get("role") != "user":
+        return None
+    text = (messages[-1].get("content") or "").lower()
+    for keyword, name, arguments in CANNED_TOOL_CALLS:
+        if keyword in text:
+            return {"id": "call_stub", "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(arguments)}}
+    return None
+
+def completion_payload(model, content, tool_call=None):
+    message = {"role": "assistant", "content": None if tool_call else content}
+    if tool_call:
+        message["tool_calls"] = [tool_call]
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if tool_call else "stop"
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    }
+
+def chunk_payload(model, delta, finish_reason=None):
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+
+def stream_chunks(model, content, tool_call=None):
+    if tool_call:
+        yield chunk_payload(model, {"role": "assistant", "tool_calls": [dict(tool_call, index=0)]})
+        yield chunk_payload(model, {}, "tool_calls")
+        return
+    yield chunk_payload(model, {"role": "assistant", "content": ""})
+    for i, word in enumerate(content.split(" ")):
+        yield chunk_payload(model, {"content": word if i == 0 else " " + word})
+    yield chunk_payload(model, {}, "stop")
+
+def make_handler(latency, jitter=0.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+            model = body.get("model", "stub")
+            tool_call = canned_tool_call(body)
+
+            if body.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for chunk in stream_chunks(model, CANNED_REPLY, tool_call):
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+                return
+
+            payload = json.dumps(completion_payload(model, CANNED_REPLY, tool_call)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve(port=8001, latency=0.3, background=False, jitter=0.0):
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency, jitter))
+    server.daemon_threads = True
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+    print(f"🤖 LLM stub on http://127.0.0.1:{port}/v1 (latency {latency}s ± {jitter}s)")
+    server.serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform random +/- added to the latency")
+    args = parser.parse_args()
+    serve(args.port, args.latency, jitter=args.jitter)
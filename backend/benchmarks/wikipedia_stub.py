@@ -0,0 +1,70 @@
+"""Stub of the Wikipedia REST summary endpoint for offline benchmarks.
+
+Answers /api/rest_v1/page/summary/<title> after a configurable latency:
+titles starting with "Missing" are 404s, titles containing "(disambiguation)"
+are disambiguation pages, everything else gets a short canned extract.
+
+    python wikipedia_stub.py --port 8004 --latency 0.05
+    WIKIPEDIA_BASE_URL=http://127.0.0.1:8004 python app.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+SUMMARY_PREFIX = "/api/rest_v1/page/summary/"
+
+def summary_payload(title):
+    name = title.replace("_", " ")
+    if "(disambiguation)" in name:
+        return {"type": "disambiguation", "title": name, "extract": f"{name} may refer to several things."}
+    return {
+        "type": "standard",
+        "title": name,
+        "extract": f"{name} is a stub article served for benchmarking. " * 3,
+        "content_urls": {"desktop": {"page": f"https://en.wikipedia.org/wiki/{title}"}}
+    }
+
+def make_handler(latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            if not self.path.startswith(SUMMARY_PREFIX):
+                status, payload = 404, {"type": "not_found"}
+            else:
+                title = unquote(self.path[len(SUMMARY_PREFIX):].split("?")[0])
+                if title.lower().startswith("missing"):
+                    status, payload = 404, {"type": "not_found", "title": title}
+                else:
+                    status, payload = 200, summary_payload(title)
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve(port=8004, latency=0.05, background=False):
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency))
+    server.daemon_threads = True
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+    print(f"📚 Wikipedia stub on http://127.0.0.1:{port} (latency {latency}s)")
+    server.serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8004)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    serve(args.port, args.latency)
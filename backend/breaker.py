@@ -0,0 +1,116 @@
+"""Circuit breaker for the LLM provider.
+
+The breaker watches the outcome of the last `window` calls. When enough of
+them failed, or were slower than `slow_seconds`, it opens: callers skip the
+provider entirely for `open_seconds` instead of each waiting for their own
+timeout. After that it lets `half_open_probes` calls through; one success
+closes it again, one failure reopens it. A probe that is cancelled, or that
+hasn't reported back within `probe_seconds`, frees its slot for another.
+"""
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, window=20, min_calls=5, failure_rate=0.5, slow_seconds=10.0,
+                 slow_rate=0.8, open_seconds=30.0, half_open_probes=1, probe_seconds=60.0):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_seconds = slow_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.probe_seconds = probe_seconds
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window)  # (failed, slow) per call
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_started = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def _refresh(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes = 0
+        # A probe that never reported back would otherwise keep the breaker half-open for good
+        if self._state == HALF_OPEN and self._probes and time.monotonic() - self._probe_started >= self.probe_seconds:
+            self._probes = 0
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        self.times_opened += 1
+
+    def allow(self):
+        """True if a call may go to the provider now; half-open admits a few probes"""
+        with self._lock:
+            self._refresh()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                self._probe_started = time.monotonic()
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, elapsed):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._calls.clear()
+                return
+            self._record(False, elapsed >= self.slow_seconds)
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            self._record(True, False)
+
+    def record_cancelled(self):
+        """The call was abandoned before it said anything about the provider; give back its probe"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def _record(self, failed, slow):
+        if self._state != CLOSED:
+            return
+        self._calls.append((failed, slow))
+        if len(self._calls) < self.min_calls:
+            return
+        failures = sum(1 for f, _ in self._calls if f)
+        slow_calls = sum(1 for _, s in self._calls if s)
+        if failures >= self.failure_rate * len(self._calls) or slow_calls >= self.slow_rate * len(self._calls):
+            self._open()
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            return {
+                "state": self._state,
+                "recent_calls": len(self._calls),
+                "recent_failures": sum(1 for f, _ in self._calls if f),
+                "recent_slow": sum(1 for _, s in self._calls if s),
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
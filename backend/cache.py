@@ -0,0 +1,194 @@
+"""In-process caches used by the tools and the chat pipeline."""
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    The first caller runs the function; callers that arrive while it is in
+    flight wait for it and get the same result (or the same exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop.
+
+    The shared call runs as its own task, so a caller that goes away (a
+    disconnected client) doesn't cancel it for the others waiting on it.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        task = self._calls[key] = asyncio.ensure_future(fn())
+        task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a TTL.
+
+    Negative results can be stored with their own (usually shorter) TTL so a
+    misspelled query is retried sooner than a good answer is refreshed.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600, negative_ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, negative=False):
+        ttl = self.negative_ttl if negative else self.ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader, is_negative=None):
+        """Return the cached value, or load it once even if many threads miss together.
+
+        Exceptions raised by the loader are not cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        def load():
+            # Another thread may have filled the entry while we waited for the lock
+            with self._lock:
+                entry = self._data.get(key)
+                if entry and entry[0] > time.monotonic():
+                    return entry[1]
+            value = loader()
+            self.set(key, value, negative=bool(is_negative and is_negative(value)))
+            return value
+
+        return self._flight.do(key, load)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self._flight.coalesced,
+        }
+
+_AMBIGUOUS = object()
+
+class ResponseCache:
+    """Replay final answers for repeated questions answered by deterministic tools.
+
+    Answers are keyed on the normalized user message plus the tool calls the
+    model resolved for it. A second index maps each message to those calls so a
+    repeat can be answered before any LLM call. If the same message ever
+    resolves to different calls (it depended on earlier context), the message
+    is marked ambiguous and no longer served from the cache. Callers only use
+    it for turns without history, whose meaning can't depend on earlier context.
+    """
+
+    def __init__(self, maxsize=2048, ttl=3600):
+        self._answers = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._resolved = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def normalize(message):
+        return " ".join(message.lower().split()).rstrip(" ?!.")
+
+    @staticmethod
+    def calls_key(calls):
+        return tuple((name, json.dumps(args, sort_keys=True)) for name, args in calls)
+
+    def lookup(self, message):
+        message_key = self.normalize(message)
+        calls = self._resolved.get(message_key)
+        if calls is None or calls is _AMBIGUOUS:
+            return None
+        return self._answers.get((message_key, calls))
+
+    def store(self, message, calls, answer):
+        message_key = self.normalize(message)
+        calls = self.calls_key(calls)
+        previous = self._resolved.get(message_key)
+        if previous is _AMBIGUOUS or (previous is not None and previous != calls):
+            self._resolved.set(message_key, _AMBIGUOUS)
+            return
+        self._resolved.set(message_key, calls)
+        self._answers.set((message_key, calls), answer)
+
+    def stats(self):
+        return self._answers.stats()
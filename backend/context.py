@@ -0,0 +1,105 @@
+"""Token-budgeted prompt building with a rolling summary of older turns.
+
+The newest turns are packed into the prompt until the token budget is used
+up. Turns that no longer fit are folded into a summary, which is cached per
+conversation and only recomputed once enough new turns have been folded.
+A cached summary remembers the last turn it covers by content rather than by
+position, so it still lines up after the session store trims old messages,
+and only the turns folded since then are summarized.
+"""
+import hashlib
+import json
+
+from cache import TTLCache
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators added by the chat template
+
+def estimate_tokens(text):
+    # ~4 characters per token for English; close enough for budgeting
+    return len(text) // 4 + 1
+
+def message_tokens(message):
+    return estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+def extractive_summary(previous, messages, max_chars=600):
+    """Cheap summary used when no LLM summarizer is available or it fails"""
+    lines = [previous] if previous else []
+    lines += [f"{m['role']}: {m['content'][:120]}" for m in messages]
+    return "\n".join(lines)[-max_chars:]
+
+def _anchor(messages, end):
+    """Fingerprint of the last turn (two messages) ending at messages[end - 1]"""
+    return hashlib.sha1(json.dumps(messages[max(0, end - 2):end]).encode()).hexdigest()
+
+class ContextWindow:
+    def __init__(self, budget=1500, summary_budget=200, refresh_after=6, summarize=None,
+                 cache_size=1024, cache_ttl=24 * 3600):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.refresh_after = refresh_after  # folded messages tolerated before re-summarizing
+        self.summarize = summarize  # fn(previous_summary, messages) -> str
+        self._summaries = TTLCache(maxsize=cache_size, ttl=cache_ttl)  # key -> (anchor, summary)
+        self.summaries_computed = 0
+
+    def build(self, system_prompt, history, user_message, conversation_key=None):
+        history = [
+            {"role": m["role"], "content": m["content"]}
+            for m in history
+            if m.get("role") in ["user", "assistant"] and m.get("content")
+        ]
+        system = {"role": "system", "content": system_prompt}
+        user = {"role": "user", "content": user_message}
+
+        remaining = self.budget - message_tokens(system) - message_tokens(user)
+
+        # Pack the newest turns first; once something is folded, reserve room for the summary
+        cut = len(history)
+        while cut > 0:
+            cost = message_tokens(history[cut - 1])
+            reserve = self.summary_budget if cut > 1 else 0
+            if cost + reserve > remaining:
+                break
+            remaining -= cost
+            cut -= 1
+
+        messages = [system]
+        if cut:
+            summary = self._summary_for(history[:cut], conversation_key)
+            if summary:
+                messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        messages.extend(history[cut:])
+        messages.append(user)
+        return messages
+
+    def _summary_for(self, folded, conversation_key):
+        # Stateless clients resend the whole history, so the first message is the
+        # only stable key; the anchor check below keeps two conversations that
+        # open with the same "hi" from sharing a summary
+        key = conversation_key or hashlib.sha1(json.dumps(folded[0]).encode()).hexdigest()
+        cached = self._summaries.get(key)
+        covered, summary = 0, ""
+        if cached:
+            anchor, cached_summary = cached
+            for end in range(len(folded), 0, -1):
+                if _anchor(folded, end) == anchor:
+                    covered, summary = end, cached_summary
+                    break
+
+        # A slightly stale summary is fine; the newest turns are in the prompt verbatim
+        if covered and len(folded) < covered + self.refresh_after:
+            return summary
+
+        previous, new_messages = summary, folded[covered:]
+        try:
+            summary = self.summarize(previous, new_messages) if self.summarize else None
+        except Exception:
+            summary = None
+        summary = summary or extractive_summary(previous, new_messages)
+        summary = summary[:self.summary_budget * 4]
+
+        self.summaries_computed += 1
+        self._summaries.set(key, (_anchor(folded, len(folded)), summary))
+        return summary
+
+    def stats(self):
+        return {"budget": self.budget, "summaries_computed": self.summaries_computed, **self._summaries.stats()}
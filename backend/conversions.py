@@ -0,0 +1,67 @@
+"""Scalar and array conversions for the currency and temperature tools.
+
+Every supported unit pair is reduced to an affine map `y = scale * x + offset`
+at import time, so a conversion is one multiply-add per value. Lists are
+converted with NumPy when it is installed and with a plain loop otherwise.
+Results too large for a float raise OverflowError instead of becoming inf.
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Mock exchange rates, units per USD
+CURRENCY_RATES = {
+    "USD": 1.0, "EUR": 0.85, "GBP": 0.73, "INR": 83.0, "JPY": 110.0,
+    "AUD": 1.35, "CAD": 1.25, "CNY": 6.5
+}
+
+# Unknown currencies are treated as USD, as they always have been
+CURRENCY_FACTORS = {
+    (src, dst): dst_rate / src_rate
+    for src, src_rate in CURRENCY_RATES.items()
+    for dst, dst_rate in CURRENCY_RATES.items()
+}
+
+# (scale, offset) to and from Celsius; unknown units are treated as Celsius
+TO_CELSIUS = {"C": (1.0, 0.0), "F": (5 / 9, -32 * 5 / 9), "K": (1.0, -273.15)}
+FROM_CELSIUS = {"C": (1.0, 0.0), "F": (9 / 5, 32.0), "K": (1.0, 273.15)}
+
+TEMPERATURE_MAPS = {
+    (src, dst): (a2 * a1, a2 * b1 + b2)
+    for src, (a1, b1) in TO_CELSIUS.items()
+    for dst, (a2, b2) in FROM_CELSIUS.items()
+}
+
+# Below this size the NumPy array round-trip costs more than it saves
+NUMPY_MIN_SIZE = 64
+
+def currency_factor(from_currency, to_currency):
+    src = from_currency.upper() if from_currency.upper() in CURRENCY_RATES else "USD"
+    dst = to_currency.upper() if to_currency.upper() in CURRENCY_RATES else "USD"
+    return CURRENCY_FACTORS[(src, dst)]
+
+def temperature_map(from_unit, to_unit):
+    src = from_unit.upper() if from_unit.upper() in TO_CELSIUS else "C"
+    dst = to_unit.upper() if to_unit.upper() in FROM_CELSIUS else "C"
+    return TEMPERATURE_MAPS[(src, dst)]
+
+def affine(values, scale, offset=0.0):
+    """scale * x + offset for a number or a list of numbers"""
+    if not isinstance(values, (list, tuple)):
+        result = values * scale + offset
+        if not math.isfinite(result):
+            raise OverflowError("Value out of range")
+        return result
+    if np is not None and len(values) >= NUMPY_MIN_SIZE:
+        with np.errstate(over="ignore"):
+            result = np.asarray(values, dtype=float) * scale + offset
+        if not np.isfinite(result).all():
+            raise OverflowError("Value out of range")
+        return result.tolist()
+    result = [x * scale + offset for x in values]
+    if not all(math.isfinite(y) for y in result):
+        raise OverflowError("Value out of range")
+    return result
@@ -0,0 +1,140 @@
+"""Safe arithmetic evaluator for the calculator tool.
+
+Expressions are parsed once into an AST, checked against a whitelist of
+operators, functions and constants, and compiled into a tree of closures that
+is cached by expression text. Exponents, intermediate integer sizes and the
+number of evaluation steps are capped, so inputs like `9**9**9` fail fast
+instead of pinning a worker.
+"""
+import ast
+import math
+import operator
+from functools import lru_cache
+
+MAX_LENGTH = 500  # characters
+MAX_STEPS = 200  # AST nodes; expressions have no loops, so steps == nodes
+MAX_EXPONENT = 10000
+MAX_RESULT_BITS = 4096  # about 1200 decimal digits
+
+class ExpressionError(ValueError):
+    pass
+
+def _check(value):
+    if isinstance(value, complex):
+        raise ExpressionError("Result is not a real number")
+    if isinstance(value, int) and value.bit_length() > MAX_RESULT_BITS:
+        raise ExpressionError(f"Result too large (max {MAX_RESULT_BITS} bits)")
+    return value
+
+def _pow(base, exponent):
+    if abs(exponent) > MAX_EXPONENT:
+        raise ExpressionError(f"Exponent too large (max {MAX_EXPONENT})")
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        # Estimate the size before computing it
+        if (abs(base).bit_length() - 1) * exponent > MAX_RESULT_BITS:
+            raise ExpressionError(f"Result too large (max {MAX_RESULT_BITS} bits)")
+    return base ** exponent
+
+def _mul(a, b):
+    if isinstance(a, int) and isinstance(b, int) and a.bit_length() + b.bit_length() > MAX_RESULT_BITS + 1:
+        raise ExpressionError(f"Result too large (max {MAX_RESULT_BITS} bits)")
+    return a * b
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _pow,
+}
+
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+FUNCTIONS = {
+    "abs": abs,
+    "round": round,
+    "min": min,
+    "max": max,
+    "sqrt": math.sqrt,
+    "exp": math.exp,
+    "log": math.log,
+    "log10": math.log10,
+    "log2": math.log2,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "floor": math.floor,
+    "ceil": math.ceil,
+}
+
+CONSTANTS = {
+    "pi": math.pi,
+    "e": math.e,
+    "tau": math.tau,
+}
+
+def _compile(node):
+    if isinstance(node, ast.Expression):
+        return _compile(node.body)
+
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ExpressionError(f"Unsupported value: {value!r}")
+        _check(value)
+        return lambda: value
+
+    if isinstance(node, ast.BinOp):
+        op = BINARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        left, right = _compile(node.left), _compile(node.right)
+        return lambda: _check(op(left(), right()))
+
+    if isinstance(node, ast.UnaryOp):
+        op = UNARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        operand = _compile(node.operand)
+        return lambda: op(operand())
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            raise ExpressionError("Unsupported function call")
+        func = FUNCTIONS[node.func.id]
+        args = [_compile(arg) for arg in node.args]
+        return lambda: _check(func(*[arg() for arg in args]))
+
+    if isinstance(node, ast.Name):
+        if node.id not in CONSTANTS:
+            raise ExpressionError(f"Unknown name: {node.id}")
+        value = CONSTANTS[node.id]
+        return lambda: value
+
+    raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+
+@lru_cache(maxsize=2048)
+def compile_expression(expression):
+    """Parse, validate and compile an expression; cached by its text"""
+    if len(expression) > MAX_LENGTH:
+        raise ExpressionError(f"Expression too long (max {MAX_LENGTH} characters)")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError:
+        raise ExpressionError("Invalid expression")
+    if sum(1 for _ in ast.walk(tree)) > MAX_STEPS:
+        raise ExpressionError(f"Expression too complex (max {MAX_STEPS} steps)")
+    return _compile(tree)
+
+def evaluate(expression):
+    try:
+        return compile_expression(expression)()
+    except ZeroDivisionError:
+        raise ExpressionError("Division by zero")
+    except OverflowError:
+        raise ExpressionError("Result too large")
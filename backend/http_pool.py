@@ -0,0 +1,59 @@
+"""Shared, pooled HTTP session for outbound tool traffic.
+
+Every network-backed tool should go through `get()` instead of calling
+`requests.get` directly, so connections (and their TLS sessions) are reused
+across requests, transient failures are retried with backoff, and no single
+host gets more than HTTP_PER_HOST_LIMIT concurrent requests from this process.
+"""
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", 10))  # distinct hosts kept alive
+POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 20))  # keep-alive connections per host
+PER_HOST_LIMIT = int(os.environ.get("HTTP_PER_HOST_LIMIT", 16))
+RETRIES = int(os.environ.get("HTTP_RETRIES", 2))
+BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF_FACTOR", 0.3))
+
+def _make_session():
+    retry = Retry(
+        total=RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False  # hand the last response back so callers can report the status
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                          max_retries=retry, pool_block=False)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+session = _make_session()
+
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+def _slots_for(host):
+    with _host_slots_lock:
+        slots = _host_slots.get(host)
+        if slots is None:
+            slots = _host_slots[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+        return slots
+
+def get(url, timeout=10, **kwargs):
+    """GET through the shared session, waiting at most `timeout` for a per-host slot"""
+    host = urlsplit(url).netloc
+    slots = _slots_for(host)
+    if not slots.acquire(timeout=timeout):
+        raise requests.exceptions.Timeout(f"Timed out waiting for a connection slot to {host}")
+    try:
+        return session.get(url, timeout=timeout, **kwargs)
+    finally:
+        slots.release()
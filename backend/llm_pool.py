@@ -0,0 +1,306 @@
+"""Weighted pool of OpenAI-compatible LLM providers with hedged requests.
+
+Each provider has its own model, weight, concurrency limit and circuit
+breaker. A call goes to a weighted-random healthy provider with a free slot;
+if it fails, the call is retried once on another provider. Once a provider
+has enough latency samples, a call still running after the p95 latency is
+hedged: the same request goes to a second provider and the first answer
+wins, so one slow provider doesn't set the tail latency for everyone.
+Streaming calls fail over but are not hedged; a stream holds its slot until
+it has been read to the end.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+
+from openai import AsyncOpenAI, OpenAI
+
+from breaker import CircuitBreaker, CircuitOpenError
+from metrics import Histogram
+
+LLM_SECONDS = Histogram("llm_call_seconds", "Latency of LLM completions per provider", ["provider"])
+
+class Provider:
+    def __init__(self, name, base_url, api_key, model, weight=1.0, max_concurrency=32, timeout=30.0, breaker=None):
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.weight = weight
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout)
+        self._async_client = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.latencies = deque(maxlen=200)  # recent successful call latencies (seconds)
+
+    @property
+    def async_client(self):
+        # Created on first use, inside the event loop that will own it
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, timeout=self.timeout)
+        return self._async_client
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight >= self.max_concurrency:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def latency_percentile(self, q):
+        samples = sorted(self.latencies)
+        return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else None
+
+    def _record(self, elapsed):
+        self.breaker.record_success(elapsed)
+        self.latencies.append(elapsed)
+        LLM_SECONDS.observe(elapsed, provider=self.name)
+
+    def _failed(self, error):
+        self.release()
+        if isinstance(error, Exception):
+            self.breaker.record_failure()
+        else:
+            # Cancelled (a hedge loser, a client that went away) or interrupted
+            self.breaker.record_cancelled()
+
+    def call(self, kwargs):
+        """Run one completion; the caller must already hold a slot from try_acquire().
+
+        A stream keeps the slot until it has been read to the end, and only
+        then reports to the breaker, so an error mid-stream counts as a failure.
+        """
+        start = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(**dict(kwargs, model=self.model))
+        except BaseException as e:
+            self._failed(e)
+            raise
+        elapsed = time.perf_counter() - start
+        if kwargs.get("stream"):
+            return self._stream(response, elapsed)
+        self.release()
+        self._record(elapsed)
+        return response
+
+    def _stream(self, stream, elapsed):
+        # elapsed is the time to the first byte, comparable with non-streamed latencies
+        try:
+            yield from stream
+        except BaseException as e:
+            self._failed(e)
+            raise
+        self.release()
+        self._record(elapsed)
+
+    async def acall(self, kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.async_client.chat.completions.create(**dict(kwargs, model=self.model))
+        except BaseException as e:
+            self._failed(e)
+            raise
+        elapsed = time.perf_counter() - start
+        if kwargs.get("stream"):
+            return self._astream(response, elapsed)
+        self.release()
+        self._record(elapsed)
+        return response
+
+    async def _astream(self, stream, elapsed):
+        try:
+            async for chunk in stream:
+                yield chunk
+        except BaseException as e:
+            self._failed(e)
+            raise
+        self.release()
+        self._record(elapsed)
+
+    def stats(self):
+        p50 = self.latency_percentile(0.5)
+        p95 = self.latency_percentile(0.95)
+        return {
+            "name": self.name,
+            "model": self.model,
+            "weight": self.weight,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "breaker": self.breaker.stats(),
+        }
+
+class ProviderPool:
+    def __init__(self, providers, hedge=True, hedge_percentile=0.95, hedge_min_samples=20, hedge_min_delay=0.05):
+        self.providers = list(providers)
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self._executor = ThreadPoolExecutor(
+            max_workers=sum(p.max_concurrency for p in self.providers),
+            thread_name_prefix="llm"
+        )
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def pick(self, exclude=()):
+        """A weighted-random healthy provider with a free slot (the slot is reserved), or None"""
+        candidates = [p for p in self.providers if p not in exclude]
+        while candidates:
+            provider = random.choices(candidates, weights=[p.weight for p in candidates])[0]
+            candidates.remove(provider)
+            if provider.try_acquire():
+                if provider.breaker.allow():
+                    return provider
+                provider.release()
+        return None
+
+    def hedge_delay(self, provider, kwargs):
+        """Seconds to wait before hedging a call to `provider`, or None to not hedge it.
+
+        The threshold is the best p95 among providers with enough samples, so
+        a provider that turns slow is hedged against the others' normal latency
+        rather than against its own degraded p95.
+        """
+        if not self.hedge or kwargs.get("stream") or len(self.providers) < 2:
+            return None
+        if len(provider.latencies) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, min(
+            p.latency_percentile(self.hedge_percentile)
+            for p in self.providers
+            if len(p.latencies) >= self.hedge_min_samples
+        ))
+
+    # ---- sync ----
+
+    def complete(self, **kwargs):
+        """chat.completions.create on the pool; raises CircuitOpenError when no provider is available"""
+        provider = self.pick()
+        if provider is None:
+            raise CircuitOpenError("No LLM provider available")
+        delay = self.hedge_delay(provider, kwargs)
+        if delay is None:
+            try:
+                return provider.call(kwargs)
+            except Exception as e:
+                return self._failover(provider, kwargs, e)
+
+        first = self._executor.submit(provider.call, kwargs)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        except Exception as e:
+            return self._failover(provider, kwargs, e)
+
+        backup = self.pick(exclude=[provider])
+        if backup is None:
+            return first.result()
+        self._count("hedged")
+        second = self._executor.submit(backup.call, kwargs)
+
+        # First successful answer wins; the loser finishes in the background
+        pending, error = {first, second}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _failover(self, provider, kwargs, error):
+        backup = self.pick(exclude=[provider])
+        if backup is None:
+            raise error
+        self._count("failovers")
+        return backup.call(kwargs)
+
+    # ---- async ----
+
+    async def acomplete(self, **kwargs):
+        provider = self.pick()
+        if provider is None:
+            raise CircuitOpenError("No LLM provider available")
+        delay = self.hedge_delay(provider, kwargs)
+        if delay is None:
+            try:
+                return await provider.acall(kwargs)
+            except Exception as e:
+                return await self._afailover(provider, kwargs, e)
+
+        first = asyncio.ensure_future(provider.acall(kwargs))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            try:
+                return first.result()
+            except Exception as e:
+                return await self._afailover(provider, kwargs, e)
+
+        backup = self.pick(exclude=[provider])
+        if backup is None:
+            return await first
+        self._count("hedged")
+        second = asyncio.ensure_future(backup.acall(kwargs))
+
+        # Unlike threads, the losing request can be cancelled
+        pending, error = {first, second}, None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _afailover(self, provider, kwargs, error):
+        backup = self.pick(exclude=[provider])
+        if backup is None:
+            raise error
+        self._count("failovers")
+        return await backup.acall(kwargs)
+
+    async def aclose(self):
+        for provider in self.providers:
+            if provider._async_client is not None:
+                await provider._async_client.close()
+
+    def load(self):
+        """Share of provider concurrency slots currently in use, 0.0-1.0"""
+        return sum(p.in_flight for p in self.providers) / sum(p.max_concurrency for p in self.providers)
+
+    def stats(self):
+        return {
+            "load": round(self.load(), 3),
+            "providers": [p.stats() for p in self.providers],
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+        }
@@ -0,0 +1,129 @@
+"""Structured, non-blocking logging for the request path.
+
+Log calls only build a LogRecord and put it on a bounded queue; a background
+QueueListener formats and writes it, so request threads never wait on stdout.
+Large values (factorial output, long messages) are truncated by the
+formatter on that background thread. INFO and DEBUG lines can be sampled per
+request with LOG_SAMPLE_RATE; warnings and errors are always kept.
+
+Environment:
+    LOG_LEVEL        DEBUG, INFO (default), WARNING, ERROR
+    LOG_FORMAT       text (default) or json
+    LOG_SAMPLE_RATE  fraction of requests whose INFO/DEBUG lines are kept (default 1.0)
+    LOG_MAX_FIELD    characters kept per field value (default 200)
+    LOG_QUEUE_SIZE   records buffered before new ones are dropped (default 10000)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import zlib
+
+import metrics
+
+LOG_LEVEL = logging.getLevelName(os.environ.get("LOG_LEVEL", "INFO").upper())
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 1.0))
+LOG_MAX_FIELD = int(os.environ.get("LOG_MAX_FIELD", 200))
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+
+def truncate(value, limit=LOG_MAX_FIELD):
+    if not isinstance(value, str):
+        value = json.dumps(value, default=str) if isinstance(value, (dict, list, tuple)) else str(value)
+    if len(value) <= limit:
+        return value
+    return f"{value[:limit]}… [{len(value) - limit} more chars]"
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        fields = " ".join(f"{key}={truncate(value)}" for key, value in record.fields.items())
+        timestamp = time.strftime("%H:%M:%S", time.localtime(record.created))
+        line = f"{timestamp} {record.levelname:<7} {record.getMessage()}"
+        return f"{line}  {fields}" if fields else line
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update((key, value if isinstance(value, (int, float, bool)) or value is None else truncate(value))
+                     for key, value in record.fields.items())
+        return json.dumps(entry, ensure_ascii=False)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Drops records instead of blocking (or raising) when the queue is full"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens in the listener thread; the record is handed over as-is
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+_queue = queue.Queue(LOG_QUEUE_SIZE)
+_stream_handler = logging.StreamHandler(sys.stdout)
+_stream_handler.setFormatter(JSONFormatter() if LOG_FORMAT == "json" else TextFormatter())
+_listener = logging.handlers.QueueListener(_queue, _stream_handler)
+_listener.start()
+atexit.register(_listener.stop)
+
+_root = logging.getLogger("chatbot")
+_root.setLevel(LOG_LEVEL)
+_root.addHandler(DroppingQueueHandler(_queue))
+_root.propagate = False
+
+def sampled():
+    """Whether this request's INFO/DEBUG lines are kept; stable for all lines of one trace"""
+    if LOG_SAMPLE_RATE >= 1.0:
+        return True
+    trace_id = metrics.current_trace_id()
+    if trace_id is None:
+        return random.random() < LOG_SAMPLE_RATE
+    return zlib.crc32(trace_id.encode()) / 0xFFFFFFFF < LOG_SAMPLE_RATE
+
+class StructuredLogger:
+    """`log.info("event", key=value, ...)`; values are formatted and truncated off-thread"""
+
+    def __init__(self, name):
+        self._logger = _root.getChild(name)
+
+    def _log(self, level, event, fields):
+        if not self._logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING and not sampled():
+            return
+        trace_id = metrics.current_trace_id()
+        if trace_id is not None:
+            fields["trace_id"] = trace_id
+        self._logger.log(level, event, extra={"fields": fields})
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, **fields):
+        self._log(logging.ERROR, event, fields)
+
+def get_logger(name):
+    return StructuredLogger(name)
+
+def stats():
+    return {"level": logging.getLevelName(LOG_LEVEL), "queued": _queue.qsize(), "dropped": DroppingQueueHandler.dropped}
@@ -0,0 +1,152 @@
+"""Latency histograms and per-request traces.
+
+Histograms are exported in the Prometheus text format on /metrics, so
+p50/p99 per stage and per tool come from `histogram_quantile()`; /metrics?format=json
+returns the same quantiles estimated in-process. When TRACE_LOG is set,
+every request also appends one JSON line with its spans to that file.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+def _round(value):
+    return None if value is None else round(value, 6)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def quantile(self, q, series):
+        """Estimate a quantile from bucket counts, like Prometheus' histogram_quantile"""
+        total = series[-2]
+        if not total:
+            return None
+        rank = q * total
+        lower, below = 0.0, 0
+        for bound, count in zip(self.buckets, series):
+            if count >= rank:
+                return lower + (bound - lower) * (rank - below) / max(count - below, 1)
+            lower, below = bound, count
+        return self.buckets[-1]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            labels = [f'{name}="{value}"' for name, value in zip(self.label_names, key)]
+            for bound, count in list(zip(self.buckets, series)) + [("+Inf", series[-2])]:
+                bucket_labels = ",".join(labels + ['le="%s"' % bound])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+            label_str = "{" + ",".join(labels) + "}" if labels else ""
+            lines.append(f"{self.name}_count{label_str} {series[-2]}")
+            lines.append(f"{self.name}_sum{label_str} {series[-1]:.6f}")
+        return lines
+
+    def summary(self):
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        return [
+            {
+                **dict(zip(self.label_names, key)),
+                "count": series[-2],
+                "mean": round(series[-1] / series[-2], 6) if series[-2] else None,
+                "p50": _round(self.quantile(0.5, series)),
+                "p90": _round(self.quantile(0.9, series)),
+                "p99": _round(self.quantile(0.99, series)),
+            }
+            for key, series in items
+        ]
+
+REGISTRY = []
+
+STAGE_SECONDS = Histogram("chat_stage_seconds", "Time spent in each stage of a chat request", ["stage"])
+TOOL_SECONDS = Histogram("tool_call_seconds", "Time spent in each tool call", ["tool"])
+
+def render_prometheus():
+    lines = []
+    for histogram in REGISTRY:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+def render_json():
+    return {histogram.name: histogram.summary() for histogram in REGISTRY}
+
+# ============================================
+# TRACES
+# ============================================
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+_trace_log_lock = threading.Lock()
+trace_log_path = os.environ.get("TRACE_LOG") or None
+
+@contextmanager
+def request_trace(route):
+    """Collect the spans of one request; the whole request is recorded as stage "total" """
+    start = time.perf_counter()
+    trace = {"id": uuid.uuid4().hex[:16], "route": route, "start": time.time(), "spans": []}
+    token = _current_trace.set((trace, start))
+    try:
+        yield trace
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage="total")
+        _current_trace.reset(token)
+        if trace_log_path:
+            trace["duration"] = round(elapsed, 6)
+            with _trace_log_lock, open(trace_log_path, "a") as f:
+                f.write(json.dumps(trace) + "\n")
+
+def current_trace_id():
+    current = _current_trace.get()
+    return current[0]["id"] if current is not None else None
+
+@contextmanager
+def span(stage, histogram=STAGE_SECONDS, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed, stage=stage, **labels)
+        current = _current_trace.get()
+        if current is not None:
+            trace, trace_start = current
+            trace["spans"].append({"stage": stage, **labels, "offset": round(start - trace_start, 6), "duration": round(elapsed, 6)})
+
+def timed_tool(name, fn):
+    """Wrap a tool so every call is recorded under tool_call_seconds{tool=name}"""
+    def call(*args, **kwargs):
+        with span("tool", histogram=TOOL_SECONDS, tool=name):
+            return fn(*args, **kwargs)
+    call.__name__ = fn.__name__
+    call.__wrapped__ = fn
+    return call
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """executor.submit that keeps the current trace, so pooled tool calls show up in it"""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
@@ -0,0 +1,87 @@
+"""Primality and factorial engines for the math tools.
+
+`is_prime` is a Miller-Rabin test behind a small-prime sieve; with the fixed
+bases below it is deterministic for every n < 3.3e24. `factorial_*` helpers
+describe n! without building it whenever the exact value would be too big to
+be useful: digit count and leading digits come from lgamma, trailing zeros
+from Legendre's formula.
+"""
+import math
+from functools import lru_cache
+
+def _sieve(limit):
+    flags = bytearray([1]) * (limit + 1)
+    flags[0:2] = b"\x00\x00"
+    for i in range(2, int(limit ** 0.5) + 1):
+        if flags[i]:
+            flags[i * i::i] = bytearray(len(flags[i * i::i]))
+    return [i for i, is_p in enumerate(flags) if is_p]
+
+SMALL_PRIMES = _sieve(1000)
+SMALL_PRIME_SET = frozenset(SMALL_PRIMES)
+
+# The first 13 primes are a deterministic witness set for n < 3.317e24
+MILLER_RABIN_BASES = SMALL_PRIMES[:13]
+DETERMINISTIC_LIMIT = 3317044064679887385961981
+
+def is_prime(n):
+    """True if n is prime; deterministic below DETERMINISTIC_LIMIT, otherwise a strong probable-prime test"""
+    if n < 2:
+        return False
+    if n in SMALL_PRIME_SET:
+        return True
+    for p in SMALL_PRIMES:
+        if n % p == 0:
+            return False
+    if n < SMALL_PRIMES[-1] ** 2:
+        return True
+
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+
+    bases = MILLER_RABIN_BASES if n < DETERMINISTIC_LIMIT else SMALL_PRIMES[:40]
+    for a in bases:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+@lru_cache(maxsize=256)
+def factorial(n):
+    # math.factorial is C code using binary splitting over odd parts
+    return math.factorial(n)
+
+def factorial_digits(n):
+    """Number of decimal digits in n!"""
+    if n < 2:
+        return 1
+    if n <= 1000:
+        return len(str(factorial(n)))
+    return int(math.lgamma(n + 1) / math.log(10)) + 1
+
+def factorial_trailing_zeros(n):
+    zeros, power = 0, 5
+    while power <= n:
+        zeros += n // power
+        power *= 5
+    return zeros
+
+def factorial_scientific(n, significant=12):
+    """n! as 'd.ddd…e+N' without computing it"""
+    if n <= 1000:
+        digits = str(factorial(n))
+        return f"{digits[0]}.{digits[1:significant]}e+{len(digits) - 1}"
+    log10 = math.lgamma(n + 1) / math.log(10)
+    exponent = int(log10)
+    mantissa = 10 ** (log10 - exponent)
+    # A double carries ~15 significant digits and the exponent uses some of them
+    significant = max(1, min(significant, 15 - len(str(exponent))))
+    return f"{mantissa:.{significant - 1}f}e+{exponent}"
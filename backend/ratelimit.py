@@ -0,0 +1,169 @@
+"""Per-client token buckets and a global in-flight cap for the chat routes.
+
+Each client (a known API key, else IP address) gets a bucket of `burst` tokens that
+refills at `rate` tokens per second; a request takes one token or is told how
+long to wait. Buckets live in this process (`MemoryBucketStore`) or in a
+SQLite file shared by every worker on the host (`SQLiteBucketStore`), so a
+client can't multiply its allowance by landing on different workers. If
+the SQLite file stays locked past its busy timeout the request is let
+through: the limiter fails open rather than failing the request.
+
+`AdmissionGate` caps the requests in flight in this process. Both refuse
+instead of queueing: the caller answers 429 with a Retry-After header.
+"""
+import math
+import sqlite3
+import threading
+import time
+
+class MemoryBucketStore:
+    """Per-process buckets; each worker enforces its own limits"""
+
+    def __init__(self):
+        self._buckets = {}  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+        self._last_purge = time.monotonic()
+        self.failed_open = 0
+
+    def take(self, key, rate, burst, cost=1):
+        """(allowed, seconds until `cost` tokens are available)"""
+        now = time.monotonic()
+        with self._lock:
+            self._purge_full(now, rate, burst)
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _purge_full(self, now, rate, burst):
+        # A bucket that has refilled completely is the same as no bucket; drop those once a minute
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        for key in [k for k, (tokens, updated_at) in self._buckets.items() if tokens + (now - updated_at) * rate >= burst]:
+            del self._buckets[key]
+
+class SQLiteBucketStore:
+    """Buckets in a SQLite file, shared by every worker process on the host"""
+
+    def __init__(self, path="ratelimit.db", timeout=1.0):
+        self._lock = threading.Lock()
+        self._last_purge = 0
+        self.failed_open = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=timeout)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")  # losing a few refills in a crash is fine
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    def take(self, key, rate, burst, cost=1):
+        now = time.time()
+        with self._lock:
+            try:
+                self._purge_full(now, rate, burst)
+                # IMMEDIATE takes the write lock up front, so the read-modify-write is atomic across processes
+                self._db.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError:
+                # Still locked after the busy timeout; a slow limiter must not turn into a failed request
+                self.failed_open += 1
+                return True, 0.0
+            try:
+                row = self._db.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens, updated_at = row if row else (burst, now)
+                tokens = min(burst, tokens + max(0.0, now - updated_at) * rate)
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                self._db.execute(
+                    "INSERT INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                    (key, tokens, now)
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+    def _purge_full(self, now, rate, burst):
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        self._db.execute("DELETE FROM buckets WHERE updated_at <= ?", (now - burst / rate,))
+
+def make_bucket_store(backend="memory", path="ratelimit.db"):
+    if backend == "sqlite":
+        return SQLiteBucketStore(path)
+    if backend == "memory":
+        return MemoryBucketStore()
+    raise ValueError(f"Unknown rate limit backend: {backend}")
+
+class RateLimiter:
+    def __init__(self, store, rate=2.0, burst=10):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def check(self, key):
+        """0 if the request may proceed, else the seconds the client should wait"""
+        allowed, retry_after = self.store.take(key, self.rate, self.burst)
+        with self._lock:
+            if allowed:
+                self.allowed += 1
+            else:
+                self.limited += 1
+        return retry_after
+
+    def stats(self):
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "clients": len(self.store),
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "failed_open": self.store.failed_open,
+        }
+
+class AdmissionGate:
+    def __init__(self, max_in_flight=64):
+        self.max_in_flight = max_in_flight
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.shed = 0
+
+    def try_enter(self):
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {"max_in_flight": self.max_in_flight, "in_flight": self.in_flight, "shed": self.shed}
+
+def retry_after_header(seconds):
+    # Retry-After takes whole seconds; never tell a client to retry immediately
+    return str(max(1, math.ceil(seconds)))
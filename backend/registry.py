@@ -0,0 +1,174 @@
+"""Decorator-based tool registry.
+
+Each tool is declared once, on its implementation:
+
+    @registry.tool("Math", "Check if a number is prime", cacheable=True,
+                   number=Param("integer", "Number to check"))
+    def is_prime(number): ...
+
+and the registry derives everything else from that: the OpenAI `tools`
+schema list, the category index for /tools, the dispatch table, and an
+argument validator compiled once per tool. Required arguments and defaults
+come from the function signature.
+"""
+import inspect
+import math
+import re
+
+INTEGER_RE = re.compile(r"[+-]?\d{1,4000}")
+
+class ToolArgumentError(ValueError):
+    pass
+
+def _integer(value, name):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and INTEGER_RE.fullmatch(value.strip()):
+        return int(value)
+    raise ToolArgumentError(f"'{name}' must be an integer")
+
+def _number(value, name):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, float) and math.isfinite(value):  # JSON bodies may carry Infinity/NaN
+        return value
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            pass
+        else:
+            if math.isfinite(number):
+                return int(number) if INTEGER_RE.fullmatch(value.strip()) else number
+    raise ToolArgumentError(f"'{name}' must be a number")
+
+def _number_or_list(value, name):
+    if isinstance(value, (list, tuple)):
+        return [_number(item, name) for item in value]
+    return _number(value, name)
+
+def _string(value, name):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise ToolArgumentError(f"'{name}' must be a string")
+
+# Parameter type -> (JSON schema, coercer)
+PARAM_TYPES = {
+    "string": ({"type": "string"}, _string),
+    "integer": ({"type": "integer"}, _integer),
+    "number": ({"type": "number"}, _number),
+    "numbers": ({"anyOf": [{"type": "number"}, {"type": "array", "items": {"type": "number"}}]}, _number_or_list),
+}
+
+class Param:
+    def __init__(self, type, description):
+        if type not in PARAM_TYPES:
+            raise ValueError(f"Unknown parameter type: {type}")
+        self.type = type
+        self.description = description
+
+    def schema(self):
+        return dict(PARAM_TYPES[self.type][0], description=self.description)
+
+class Tool:
+    def __init__(self, func, category, description, params, cacheable=False, timeout=None, parallel=False,
+                 cpu_bound=False, nondeterministic=False):
+        self.name = self.__name__ = func.__name__
+        self.func = func
+        self.category = category
+        self.description = description
+        self.params = params
+        self.cacheable = cacheable  # output depends only on the arguments
+        self.timeout = timeout  # seconds; None means the registry default
+        self.parallel = parallel  # I/O-bound: worth a thread hop in batches
+        self.cpu_bound = cpu_bound  # can hold the GIL for long: run out of process
+        self.nondeterministic = nondeterministic  # random output: never share a result between requests
+
+        signature = inspect.signature(func)
+        unknown = set(params) - set(signature.parameters)
+        if unknown:
+            raise ValueError(f"{self.name}: parameters {sorted(unknown)} are not in the signature")
+        self.required = [name for name in params if signature.parameters[name].default is inspect.Parameter.empty]
+        # Compiled once: (name, coercer, required) per parameter
+        self._checks = tuple((name, PARAM_TYPES[param.type][1], name in self.required) for name, param in params.items())
+        self._allowed = frozenset(params)
+
+    def schema(self):
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": {
+                    "type": "object",
+                    "properties": {name: param.schema() for name, param in self.params.items()},
+                    "required": self.required
+                }
+            }
+        }
+
+    def validate(self, args):
+        """Checked and coerced copy of `args`; raises ToolArgumentError"""
+        if not isinstance(args, dict):
+            raise ToolArgumentError(f"Invalid arguments for {self.name}: expected an object")
+        if not self._allowed.issuperset(args):
+            unexpected = sorted(set(args) - self._allowed)
+            raise ToolArgumentError(f"Invalid arguments for {self.name}: unexpected {', '.join(map(repr, unexpected))}")
+        checked = {}
+        for name, coerce, required in self._checks:
+            value = args.get(name)
+            if value is not None:
+                try:
+                    checked[name] = coerce(value, name)
+                except ToolArgumentError as e:
+                    raise ToolArgumentError(f"Invalid arguments for {self.name}: {e}")
+            elif required:
+                raise ToolArgumentError(f"Invalid arguments for {self.name}: '{name}' is required")
+        return checked
+
+    def __call__(self, **kwargs):
+        return self.func(**self.validate(kwargs))
+
+class ToolRegistry:
+    def __init__(self, default_timeout=5):
+        self.default_timeout = default_timeout
+        self.tools = {}
+
+    def tool(self, category, description, cacheable=False, timeout=None, parallel=False, cpu_bound=False,
+             nondeterministic=False, **params):
+        """Register the decorated function as a tool; the function itself is returned unchanged"""
+        def register(func):
+            if func.__name__ in self.tools:
+                raise ValueError(f"Tool registered twice: {func.__name__}")
+            self.tools[func.__name__] = Tool(func, category, description, params, cacheable, timeout, parallel, cpu_bound,
+                                             nondeterministic)
+            return func
+        return register
+
+    def schemas(self):
+        return [tool.schema() for tool in self.tools.values()]
+
+    def categories(self):
+        index = {}
+        for tool in self.tools.values():
+            index.setdefault(tool.category, []).append(tool.name)
+        return index
+
+    def dispatch_table(self, wrap=None):
+        """name -> callable that validates its keyword arguments, then runs the tool"""
+        return {name: wrap(name, tool) if wrap else tool for name, tool in self.tools.items()}
+
+    def functions(self, flag):
+        """name -> undecorated function for the tools with a flag set"""
+        return {name: tool.func for name, tool in self.tools.items() if getattr(tool, flag)}
+
+    def names(self, flag):
+        """Names of the tools with a flag set, e.g. names("cacheable")"""
+        return frozenset(name for name, tool in self.tools.items() if getattr(tool, flag))
+
+    def timeouts(self):
+        return {name: tool.timeout or self.default_timeout for name, tool in self.tools.items()}
@@ -0,0 +1,83 @@
+"""Templated replies for tool results, used when we answer without the LLM.
+
+`ReplyPolicy` decides, per turn, whether tool results are answered with these
+templates or phrased by a second LLM completion.
+"""
+import threading
+
+TOOL_TEMPLATES = {
+    "get_time": "It's {output} ⏰",
+    "calculate_age": "{output} 🎂",
+    "days_until": "{output} 📅",
+    "calculator": "{output} 🧮",
+    "is_prime": "{output}",
+    "factorial": "{output}",
+    "fibonacci": "Here's the Fibonacci sequence: {output}",
+    "get_weather": "Here's the weather for {output} 🌤️",
+    "get_random_fact": "Here's a fun fact: {output} 🤓",
+    "get_joke": "{output} 😂",
+    "get_quote": "Here's a quote for you: \"{output}\"",
+    "roll_dice": "🎲 {output}!",
+    "flip_coin": "🪙 {output}!",
+    "generate_password": "Here's your new password: {output} 🔑",
+    "magic_8ball": "🎱 {output}",
+    "random_number": "🎲 {output}",
+    "count_words": "{output} 📝",
+    "reverse_text": "Here it is reversed: {output}",
+    "text_to_uppercase": "Here you go: {output}",
+    "text_to_lowercase": "Here you go: {output}",
+    "convert_currency": "{output} 💱",
+    "convert_temperature": "{output} 🌡️",
+    "encode_base64": "Encoded: {output}",
+    "decode_base64": "Decoded: {output}",
+}
+
+# Tools whose raw output reads badly on its own (long extracts); "auto" lets the LLM phrase these
+LLM_PHRASED_TOOLS = {"search_wikipedia"}
+
+REPLY_STYLES = ("auto", "template", "llm")
+
+DEFAULT_TEMPLATE = "Here's what I found: {output}"
+
+def render_reply(func_name, result):
+    if not result.get("success"):
+        return f"Sorry, that didn't work: {result['output']}"
+    return TOOL_TEMPLATES.get(func_name, DEFAULT_TEMPLATE).format(output=result["output"])
+
+def render_replies(func_names, results):
+    """One templated reply for all the tool calls of a turn"""
+    return " ".join(render_reply(name, result) for name, result in zip(func_names, results))
+
+class ReplyPolicy:
+    """Template or LLM phrasing for a turn's tool results.
+
+    mode "template" and "llm" force one style; "auto" templates every tool not
+    in LLM_PHRASED_TOOLS, and templates everything once the LLM load (share of
+    provider slots in use) reaches `load_threshold`. A per-request style
+    overrides the mode. A turn with no known tools has nothing to template,
+    so it is always phrased by the LLM.
+    """
+
+    def __init__(self, mode="auto", load_threshold=0.75):
+        self.mode = mode
+        self.load_threshold = load_threshold
+        self._lock = threading.Lock()
+        self.counts = {"template": 0, "llm": 0}
+
+    def use_template(self, func_names, style=None, load=0.0):
+        style = style if style in REPLY_STYLES else self.mode
+        if not func_names:
+            template = False
+        elif style == "template":
+            template = True
+        elif style == "llm":
+            template = False
+        else:
+            template = load >= self.load_threshold or not LLM_PHRASED_TOOLS.intersection(func_names)
+        with self._lock:
+            self.counts["template" if template else "llm"] += 1
+        return template
+
+    def stats(self):
+        with self._lock:
+            return {"mode": self.mode, "load_threshold": self.load_threshold, **self.counts}
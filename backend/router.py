@@ -0,0 +1,289 @@
+"""Rule-based intent detection and the pre-LLM fast path.
+
+`detect_intent` scores the smart-fallback rules and returns the best match
+with a confidence between 0 and 1; its keyword matcher is built once at
+import time. Confidence starts from the intent's base value and drops for
+every word the intent doesn't account for, for long messages and for open
+questions, so "write a function to compute factorial of 5" is left to the
+LLM while "factorial of 5" is not. `FastPathRouter` uses it to call a tool
+directly, skipping the tool-selection LLM call, when the confidence clears
+its threshold.
+"""
+import re
+import threading
+
+# Keywords per intent, matched as whole words or phrases, so "hi" no longer
+# fires inside "this" and "fib" no longer fires inside "fiber".
+INTENT_KEYWORDS = {
+    "search_wikipedia": ["who is", "who are", "what is", "tell me about", "search for", "wikipedia"],
+    "get_weather": ["weather", "temperature"],
+    "calculator": ["calculate", "compute", "what is", "what's", "solve"],
+    "get_time": ["time", "date", "today", "now"],
+    "greeting": ["hi", "hello", "hey"],
+    "get_joke": ["joke", "jokes", "funny", "laugh", "laughs", "laughing", "humor", "humour"],
+    "get_random_fact": ["fact", "facts", "interesting", "trivia"],
+    "get_quote": ["quote", "quotes", "inspire", "inspiring", "inspiration", "motivate",
+                  "motivated", "motivation", "motivational"],
+    "roll_dice": ["dice", "roll"],
+    "flip_coin": ["coin", "flip", "heads", "tails"],
+    "generate_password": ["password", "passwords"],
+    "magic_8ball": ["8 ball", "8ball", "magic 8", "magic 8 ball"],
+    "is_prime": ["prime", "primes"],
+    "factorial": ["factorial"],
+    "fibonacci": ["fibonacci", "fib"],
+}
+
+# Priority table: intents in tie-break order with their base confidence
+INTENT_PRIORITY = [
+    ("search_wikipedia", 0.6),
+    ("get_weather", 0.85),
+    ("calculator", 0.9),
+    ("get_time", 0.7),
+    ("greeting", 0.2),  # greetings: the LLM should answer these
+    ("get_joke", 0.85),
+    ("get_random_fact", 0.8),
+    ("get_quote", 0.8),
+    ("roll_dice", 0.9),
+    ("flip_coin", 0.9),
+    ("generate_password", 0.85),
+    ("magic_8ball", 0.9),
+    ("is_prime", 0.9),
+    ("factorial", 0.9),
+    ("fibonacci", 0.85),
+]
+
+def _build_matcher():
+    """Keyword index plus one regex that splits a message into words and known phrases.
+
+    Phrases ("tell me about", "magic 8") come first in the alternation so they
+    are returned as single tokens; every token is then a single set/dict lookup.
+    """
+    index = {}
+    for intent, keywords in INTENT_KEYWORDS.items():
+        for keyword in keywords:
+            index.setdefault(keyword, []).append(intent)
+    phrases = sorted((k for k in index if " " in k), key=len, reverse=True)
+    pattern = r"\b(?:" + "|".join(re.escape(p) for p in phrases) + r")\b|[a-z0-9']+"
+    return re.compile(pattern), index, frozenset(index)
+
+TOKEN_RE, KEYWORD_INDEX, KEYWORDS = _build_matcher()
+PRIORITY = {intent: (rank, confidence) for rank, (intent, confidence) in enumerate(INTENT_PRIORITY)}
+
+# Extractors can only lower an intent's confidence, so evaluating in descending
+# base confidence lets detect_intent stop as soon as nothing left can win
+EVAL_ORDER = sorted(PRIORITY, key=lambda intent: (-PRIORITY[intent][1], PRIORITY[intent][0]))
+EVAL_RANK = {intent: i for i, intent in enumerate(EVAL_ORDER)}
+
+# Words that carry no request of their own ("please flip a coin for me"); any
+# other word the intent doesn't account for costs confidence
+FILLER_WORDS = frozenset("""
+    a an the please pls me my for of to in on at is it i can you could would
+    want need give tell show what's whats let's lets now just quick some one
+    another new random make create get do
+""".split())
+# Words that are filler only for one intent: "first 10 fibonacci numbers" is
+# a plain request, "the first 10 primes" is not a primality check
+INTENT_FILLER = {
+    "fibonacci": frozenset(["first", "numbers", "sequence"]),
+    "generate_password": frozenset(["generate", "characters", "chars", "digits"]),
+    "roll_dice": frozenset(["sided", "sides"]),
+    "magic_8ball": frozenset(["ask", "shake"]),
+}
+LEFTOVER_PENALTY = 0.1  # per unexplained word
+LONG_MESSAGE_WORDS = 10
+LONG_MESSAGE_PENALTY = 0.2
+QUESTION_PENALTY = 0.15
+# Open questions ("how do I...", "should I...") ask for an explanation, not a tool run
+QUESTION_WORDS = frozenset("how why when which should could would does do did can will".split())
+
+NUMBER_RE = re.compile(r"\d+")
+SIGNED_NUMBER_RE = re.compile(r"(?<![\w-])-?\d+")
+MATH_RE = re.compile(r"[\d\+\-\*/\(\)\.\s]+")
+WIKI_STRIP_RE = re.compile(r"(who is|who are|what is|what are|tell me about|search for|search|wikipedia|on wikipedia|\?)", re.IGNORECASE)
+DICE_SIDES_RE = re.compile(r"\bd(\d+)\b")
+CITY_RE = re.compile(r"\b(chennai|mumbai|delhi|bangalore|kolkata|hyderabad|new york|london|tokyo|paris)\b")
+
+def _first_number(user_message):
+    """First number in the message, sign included, so "factorial of -5" isn't read as 5"""
+    match = SIGNED_NUMBER_RE.search(user_message)
+    # Absurdly long numbers go to the LLM instead of being parsed here
+    return int(match.group()) if match and len(match.group()) <= 100 else None
+
+# Argument extractors: (arguments, confidence) or None when the intent can't be served.
+# `content` is the message's words minus FILLER_WORDS.
+def _wikipedia(user_message, msg, content, keywords, confidence):
+    query = WIKI_STRIP_RE.sub('', user_message).strip()
+    return ({"query": query}, confidence) if query else None
+
+def _weather(user_message, msg, content, keywords, confidence):
+    city = CITY_RE.search(msg)
+    if city:
+        return {"city": city.group(1).title()}, confidence
+    return {"city": "Chennai"}, 0.4
+
+def _calculator(user_message, msg, content, keywords, confidence):
+    matches = MATH_RE.findall(user_message)
+    if matches:
+        expression = max(matches, key=len).strip()
+        if expression and any(op in expression for op in '+-*/'):
+            # The arithmetic has to be most of the message: "what is the GDP of
+            # India in 2020-2021?" mentions a range, it doesn't ask for a subtraction
+            other = content.difference(keywords)
+            words = sum(len(t) for t in other if not t.isdigit())
+            if len(expression.replace(" ", "")) >= 2 * words:
+                return {"expression": expression}, confidence
+    return None
+
+def _dice(user_message, msg, content, keywords, confidence):
+    notation = DICE_SIDES_RE.search(msg)  # "roll a d20"
+    if notation:
+        sides = int(notation.group(1))
+    else:
+        numbers = NUMBER_RE.findall(msg)
+        sides = 20 if '20' in numbers else 12 if '12' in numbers else 6
+    if sides < 1:
+        return None  # "roll a d0": let the LLM answer
+    return {"sides": sides}, confidence if "dice" in keywords or notation else 0.75
+
+def _coin(user_message, msg, content, keywords, confidence):
+    return {}, confidence if "coin" in keywords else 0.6
+
+# Negative counts and lengths are left to the LLM, which can explain the problem
+def _password(user_message, msg, content, keywords, confidence):
+    length = _first_number(user_message)
+    if length is not None and length < 0:
+        return None
+    return {"length": length or 12}, confidence
+
+def _number_arg(name):
+    def extract(user_message, msg, content, keywords, confidence):
+        number = _first_number(user_message)
+        return ({name: number}, confidence) if number is not None and number >= 0 else None
+    return extract
+
+def _fibonacci(user_message, msg, content, keywords, confidence):
+    count = _first_number(user_message)
+    if count is not None and count < 0:
+        return None
+    return {"count": 10 if count is None else count}, confidence if "fibonacci" in keywords else 0.6
+
+def _no_args(user_message, msg, content, keywords, confidence):
+    return {}, confidence
+
+EXTRACTORS = {
+    "search_wikipedia": _wikipedia,
+    "get_weather": _weather,
+    "calculator": _calculator,
+    "get_time": _no_args,
+    "greeting": _no_args,
+    "get_joke": _no_args,
+    "get_random_fact": _no_args,
+    "get_quote": _no_args,
+    "roll_dice": _dice,
+    "flip_coin": _coin,
+    "generate_password": _password,
+    "magic_8ball": _no_args,
+    "is_prime": _number_arg("number"),
+    "factorial": _number_arg("number"),
+    "fibonacci": _fibonacci,
+}
+
+# Intents that map onto a different tool
+INTENT_TOOLS = {"greeting": "get_time"}
+
+def _leftover_words(intent, content, keywords, arguments):
+    """How many distinct words of the message (filler already removed) the intent doesn't account for"""
+    rest = content.difference(keywords, INTENT_FILLER.get(intent, ()))
+    if not rest:
+        return 0
+    # Arguments are cut from the message, so their words appear in it verbatim
+    text = " ".join(map(str, arguments.values())).lower()
+    leftover = 0
+    for t in rest:
+        if t not in text and not (t[0] == "d" and t[1:] in text):  # "d20" carries sides=20
+            leftover += 1
+    return leftover
+
+def detect_intent(user_message):
+    """Best {"name", "arguments", "confidence"} for the message, or None"""
+    msg = user_message.lower().strip()
+    tokens = TOKEN_RE.findall(msg)
+
+    matched = {}
+    for keyword in KEYWORDS.intersection(tokens):
+        for intent in KEYWORD_INDEX[keyword]:
+            matched.setdefault(intent, set()).add(keyword)
+    if not matched:
+        return None
+
+    # Penalties that depend only on the message, shared by every intent
+    content = set(tokens) - FILLER_WORDS
+    penalty = LONG_MESSAGE_PENALTY if len(tokens) > LONG_MESSAGE_WORDS else 0.0
+    if tokens[0] in QUESTION_WORDS:
+        penalty += QUESTION_PENALTY
+
+    # Highest confidence wins; ties go to the higher-priority intent
+    best = None
+    best_key = None
+    for intent in sorted(matched, key=EVAL_RANK.__getitem__):
+        rank, confidence = PRIORITY[intent]
+        if best_key and best_key[0] > confidence - penalty:
+            break
+        keywords = matched[intent]
+        extracted = EXTRACTORS[intent](user_message, msg, content, keywords, confidence)
+        if not extracted:
+            continue
+        arguments, confidence = extracted
+        confidence -= penalty + LEFTOVER_PENALTY * _leftover_words(intent, content, keywords, arguments)
+        if best_key is None or (confidence, -rank) > best_key:
+            best_key = (confidence, -rank)
+            best = {"name": INTENT_TOOLS.get(intent, intent), "arguments": arguments, "confidence": confidence}
+    return best
+
+class FastPathRouter:
+    """Decides when a message can skip the tool-selection LLM call, and counts how often it does"""
+
+    def __init__(self, threshold=0.85, detect=detect_intent):
+        self.threshold = threshold
+        self.detect = detect
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.fired = 0
+        self.by_tool = {}
+        self.saved_seconds = 0.0
+        self.llm_latency = None  # moving average of a full LLM turn
+
+    def route(self, user_message):
+        """The intent to execute directly, or None to go through the LLM"""
+        intent = self.detect(user_message)
+        with self._lock:
+            self.requests += 1
+        if intent and intent["confidence"] >= self.threshold:
+            return intent
+        return None
+
+    def record_fast_path(self, intent, elapsed):
+        with self._lock:
+            self.fired += 1
+            self.by_tool[intent["name"]] = self.by_tool.get(intent["name"], 0) + 1
+            if self.llm_latency is not None:
+                self.saved_seconds += max(0.0, self.llm_latency - elapsed)
+
+    def record_llm_turn(self, elapsed):
+        with self._lock:
+            if self.llm_latency is None:
+                self.llm_latency = elapsed
+            else:
+                self.llm_latency = 0.9 * self.llm_latency + 0.1 * elapsed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "requests": self.requests,
+                "fired": self.fired,
+                "hit_rate": round(self.fired / self.requests, 3) if self.requests else 0.0,
+                "by_tool": dict(self.by_tool),
+                "avg_llm_turn_seconds": round(self.llm_latency, 3) if self.llm_latency is not None else None,
+                "estimated_seconds_saved": round(self.saved_seconds, 3),
+            }
@@ -0,0 +1,170 @@
+"""Pre-forked worker processes for CPU-heavy tools.
+
+A big factorial or a long password keeps the GIL busy and stalls every other
+conversation in the process. `SandboxPool` forks a fixed set of workers (one
+per core by default) and runs such tools there, one call per worker at a
+time. Each call gets its own CPU-time budget (RLIMIT_CPU, raised past the
+worker's usage so far before every call) and each worker an address-space
+cap on top of its forked image (RLIMIT_AS). A worker that blows its CPU
+budget is killed by the kernel, one that overruns the wall-clock timeout is
+killed by the pool, and either way a fresh worker is forked in its place.
+
+Workers are forked from the serving process, so the tool functions need no
+pickling; they must not log or touch locks shared with other threads.
+"""
+import math
+import multiprocessing
+import os
+import queue
+import random
+import resource
+import signal
+import threading
+
+class SandboxError(RuntimeError):
+    pass
+
+def _address_space():
+    """Current virtual memory size of this process in bytes, or None if unknown"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+def _cpu_used():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def _worker_main(conn, functions, cpu_seconds, memory_bytes, parent_pid):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C goes to the server, which stops the workers
+    random.seed()  # forked workers would otherwise share the parent's random state
+    if memory_bytes:
+        base = _address_space() or 0
+        resource.setrlimit(resource.RLIMIT_AS, (base + memory_bytes, resource.RLIM_INFINITY))
+    while True:
+        try:
+            # Siblings forked later hold copies of this pipe, so a dead server
+            # doesn't always mean EOF here; being re-parented does
+            while not conn.poll(1.0):
+                if os.getppid() != parent_pid:
+                    return
+            name, kwargs = conn.recv()
+        except (EOFError, OSError):
+            return  # the server went away
+        # The soft limit raises SIGXCPU, whose default action terminates the worker
+        limit = math.ceil(_cpu_used() + cpu_seconds)
+        resource.setrlimit(resource.RLIMIT_CPU, (limit, resource.RLIM_INFINITY))
+        try:
+            reply = ("ok", functions[name](**kwargs))
+        except MemoryError:
+            reply = ("error", "Memory limit exceeded")
+        except Exception as e:
+            reply = ("error", str(e))
+        conn.send(reply)
+
+class Worker:
+    """One forked worker process. Plain os.fork rather than multiprocessing.Process,
+    which refuses to start children from daemonic server workers (hypercorn's)."""
+
+    def __init__(self, functions, cpu_seconds, memory_bytes):
+        self.conn, child_conn = multiprocessing.Pipe()
+        parent_pid = os.getpid()
+        self.pid = os.fork()
+        if self.pid == 0:
+            status = 0
+            try:
+                self.conn.close()
+                _worker_main(child_conn, functions, cpu_seconds, memory_bytes, parent_pid)
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)  # never run the server's atexit handlers
+        child_conn.close()
+        self.exitcode = None
+
+    def kill(self):
+        """Stop the worker (if it isn't already dead) and reap it"""
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        _, status = os.waitpid(self.pid, 0)
+        self.exitcode = os.waitstatus_to_exitcode(status)
+        self.conn.close()
+
+class SandboxPool:
+    def __init__(self, functions, workers=None, cpu_seconds=2.0, memory_mb=256, timeout=None):
+        self.functions = dict(functions)
+        self.workers = workers or len(os.sched_getaffinity(0))
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_mb * 1024 * 1024 if memory_mb else None
+        # Wall-clock backstop for calls that block without burning CPU; long
+        # enough that the CPU limit (whole seconds) normally fires first
+        self.timeout = timeout or cpu_seconds * 2 + 1
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.killed = {"cpu": 0, "timeout": 0, "crash": 0}
+        for _ in range(self.workers):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        return Worker(self.functions, self.cpu_seconds, self.memory_bytes)
+
+    def _count(self, reason=None):
+        with self._lock:
+            if reason:
+                self.killed[reason] += 1
+            else:
+                self.calls += 1
+
+    def call(self, name, kwargs):
+        """Run functions[name](**kwargs) in a worker; raises SandboxError if the worker had to be killed"""
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise SandboxError(f"All {self.workers} sandbox workers busy")
+        self._count()
+        try:
+            worker.conn.send((name, kwargs))
+            if worker.conn.poll(self.timeout):
+                status, value = worker.conn.recv()
+            else:
+                worker.kill()
+                worker = self._spawn()
+                self._count("timeout")
+                raise SandboxError(f"Timed out after {self.timeout:g}s")
+        except (EOFError, OSError):
+            worker.kill()
+            exitcode = worker.exitcode
+            worker = self._spawn()
+            if exitcode == -signal.SIGXCPU:
+                self._count("cpu")
+                raise SandboxError(f"CPU time limit exceeded ({self.cpu_seconds:g}s)")
+            self._count("crash")
+            raise SandboxError(f"Sandbox worker exited (code {exitcode})")
+        finally:
+            self._idle.put(worker)
+        if status == "error":
+            raise SandboxError(value)
+        return value
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                return
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "idle": self._idle.qsize(),
+                "cpu_seconds": self.cpu_seconds,
+                "memory_mb": self.memory_bytes // (1024 * 1024) if self.memory_bytes else None,
+                "timeout_seconds": self.timeout,
+                "calls": self.calls,
+                "killed": dict(self.killed),
+            }
@@ -0,0 +1,147 @@
+"""Server-side conversation history, keyed by conversation ID.
+
+Clients send only the new message plus their conversation ID; the history
+lives here and expires after SESSION_TTL seconds without activity.
+
+A conversation ID is a bearer token: there are no accounts, so any client that
+knows an ID can read that conversation's history and append to it. IDs are
+random UUIDs; clients must keep them as private as the conversation itself.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from cache import TTLCache
+
+MAX_CONVERSATION_ID_LENGTH = 128
+
+class InvalidConversation(ValueError):
+    """The request's conversation_id or history can't be used; answered with 400"""
+
+def new_conversation_id():
+    return uuid.uuid4().hex
+
+class MemorySessionStore:
+    """Per-process store; conversations are lost on restart.
+
+    Holds at most `max_sessions` conversations; past that the least recently
+    used one is dropped, so a flood of new IDs can't grow it without bound.
+    """
+
+    def __init__(self, ttl=24 * 3600, max_messages=200, max_sessions=10000):
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self._sessions = TTLCache(maxsize=max_sessions, ttl=ttl)  # id -> messages
+        self._lock = threading.Lock()  # append is a read-modify-write
+
+    def get(self, conversation_id):
+        return list(self._sessions.get(conversation_id, []))
+
+    def append(self, conversation_id, messages):
+        with self._lock:
+            history = self._sessions.get(conversation_id, [])
+            self._sessions.set(conversation_id, (history + messages)[-self.max_messages:])
+
+    def delete(self, conversation_id):
+        with self._lock:
+            self._sessions.delete(conversation_id)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        return self._sessions.stats()
+
+class SQLiteSessionStore:
+    """On-disk store that survives restarts and can be shared by worker processes"""
+
+    def __init__(self, path="sessions.db", ttl=24 * 3600, max_messages=200):
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+        self._last_purge = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id TEXT NOT NULL,
+                message TEXT NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS messages_by_conversation ON messages (conversation_id, seq)")
+
+    def get(self, conversation_id):
+        with self._lock:
+            self._purge_expired()
+            row = self._db.execute("SELECT updated_at FROM conversations WHERE id = ?", (conversation_id,)).fetchone()
+            if row is None or row[0] + self.ttl <= time.time():
+                return []
+            rows = self._db.execute(
+                "SELECT message FROM messages WHERE conversation_id = ? ORDER BY seq DESC LIMIT ?",
+                (conversation_id, self.max_messages)
+            ).fetchall()
+            return [json.loads(message) for (message,) in reversed(rows)]
+
+    def append(self, conversation_id, messages):
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                row = self._db.execute("SELECT updated_at FROM conversations WHERE id = ?", (conversation_id,)).fetchone()
+                if row is not None and row[0] + self.ttl <= now:
+                    self._db.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+                self._db.execute(
+                    "INSERT INTO conversations (id, updated_at) VALUES (?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at",
+                    (conversation_id, now)
+                )
+                self._db.executemany(
+                    "INSERT INTO messages (conversation_id, message) VALUES (?, ?)",
+                    [(conversation_id, json.dumps(message)) for message in messages]
+                )
+                self._db.execute(
+                    "DELETE FROM messages WHERE conversation_id = ? AND seq NOT IN "
+                    "(SELECT seq FROM messages WHERE conversation_id = ? ORDER BY seq DESC LIMIT ?)",
+                    (conversation_id, conversation_id, self.max_messages)
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def delete(self, conversation_id):
+        with self._lock:
+            self._db.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+            self._db.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def _purge_expired(self):
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        cutoff = now - self.ttl
+        self._db.execute(
+            "DELETE FROM messages WHERE conversation_id IN (SELECT id FROM conversations WHERE updated_at <= ?)",
+            (cutoff,)
+        )
+        self._db.execute("DELETE FROM conversations WHERE updated_at <= ?", (cutoff,))
+
+def make_session_store(backend="memory", ttl=24 * 3600, path="sessions.db", max_sessions=10000):
+    if backend == "sqlite":
+        return SQLiteSessionStore(path, ttl=ttl)
+    if backend == "memory":
+        return MemorySessionStore(ttl=ttl, max_sessions=max_sessions)
+    raise ValueError(f"Unknown session store backend: {backend}")
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ.setdefault("RATE_LIMIT", "0")
+
+import pytest
+
+import app
+import async_app
+
+class Slow:
+    """Stand-in network tool that records how many calls run at once"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+
+    def enter(self):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+
+    def leave(self):
+        with self.lock:
+            self.running -= 1
+
+    def __call__(self, query):
+        self.enter()
+        try:
+            time.sleep(2 if query == "hang" else 0.1)
+            return {"output": query}
+        finally:
+            self.leave()
+
+    async def acall(self, query):
+        self.enter()
+        try:
+            await asyncio.sleep(2 if query == "hang" else 0.1)
+            return {"output": query}
+        finally:
+            self.leave()
+
+@pytest.fixture
+def slow(monkeypatch):
+    slow = Slow()
+    monkeypatch.setitem(app.available_functions, "search_wikipedia", slow)
+    monkeypatch.setitem(async_app.async_functions, "search_wikipedia", slow.acall)
+    monkeypatch.setitem(app.TOOL_TIMEOUTS, "search_wikipedia", 0.5)
+    return slow
+
+def post_sync(body):
+    response = app.app.test_client().post("/tools/batch", json=body)
+    try:
+        return response.status_code, response.get_data(as_text=True)
+    finally:
+        response.close()
+
+# async_app's semaphores bind to the first loop that waits on them, as under hypercorn
+loop = asyncio.new_event_loop()
+
+def post_async(body):
+    async def post():
+        response = await async_app.app.test_client().post("/tools/batch", json=body)
+        return response.status_code, await response.get_data(as_text=True)
+    return loop.run_until_complete(post())
+
+@pytest.fixture(params=["sync", "async"])
+def post(request):
+    return post_sync if request.param == "sync" else post_async
+
+def run_batch(post, calls):
+    status, body = post({"calls": calls})
+    assert status == 200
+    return [json.loads(line) for line in body.splitlines()]
+
+def wikipedia(query):
+    return {"name": "search_wikipedia", "arguments": {"query": query}}
+
+def test_every_call_gets_one_line_with_its_index(post, slow):
+    calls = [wikipedia(f"q{i}") for i in range(5)] + [
+        {"name": "factorial", "arguments": {"number": 5}},
+        {"name": "flip_coin"},
+        {"name": "reverse_text", "arguments": {"text": "abc"}},
+    ]
+    lines = run_batch(post, calls)
+    assert sorted(line["index"] for line in lines) == list(range(len(calls)))
+    by_index = {line["index"]: line for line in lines}
+    assert by_index[0]["result"] == {"output": "q0"}
+    assert by_index[5]["name"] == "factorial" and by_index[5]["result"]["success"]
+    # Calls that run inline are answered in request order
+    inline = [line["index"] for line in lines if line["index"] >= 6]
+    assert inline == [6, 7]
+
+def test_per_call_errors_do_not_fail_the_batch(post, slow):
+    lines = run_batch(post, [
+        {"name": "nope"},
+        {"name": "factorial", "arguments": "{not json"},
+        {"name": "factorial", "arguments": [5]},
+        {"name": "factorial", "arguments": {"number": "x"}},
+        wikipedia("hang"),
+        {"name": "flip_coin"},
+    ])
+    by_index = {line["index"]: line for line in lines}
+    assert by_index[0]["error"] == "Unknown tool: nope"
+    assert by_index[1]["error"] == "Invalid arguments: not valid JSON"
+    assert by_index[2]["error"] == "Invalid arguments: expected an object"
+    assert "must be an integer" in json.dumps(by_index[3])
+    assert by_index[4]["error"] == "Timed out after 0.5s"
+    assert "result" in by_index[5]
+
+def test_pooled_calls_are_bounded(post, slow):
+    lines = run_batch(post, [wikipedia(f"q{i}") for i in range(4 * app.BATCH_WORKERS)])
+    assert len(lines) == 4 * app.BATCH_WORKERS
+    assert all("result" in line for line in lines)
+    assert 1 < slow.peak <= app.BATCH_WORKERS
+
+def test_malformed_body_is_rejected(post):
+    status, body = post({"calls": 5})
+    assert status == 400
+    assert "error" in json.loads(body)
+
+def test_sandboxed_tools_run_on_the_tool_pool(monkeypatch):
+    threads = []
+    def factorial(number):
+        threads.append(threading.current_thread().name)
+        return {"output": number}
+    monkeypatch.setitem(app.available_functions, "factorial", factorial)
+    monkeypatch.setattr(app, "BATCH_SANDBOXED_TOOLS", frozenset(["factorial"]))
+    lines = run_batch(post_sync, [{"name": "factorial", "arguments": {"number": n}} for n in range(3)])
+    assert sorted(line["result"]["output"] for line in lines) == [0, 1, 2]
+    assert all(name.startswith("tool") for name in threads)
@@ -0,0 +1,81 @@
+import pytest
+
+import breaker
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(breaker.time, "monotonic", lambda: now[0])
+    return now
+
+def opened(**kwargs):
+    b = CircuitBreaker(window=4, min_calls=4, open_seconds=30, probe_seconds=60, **kwargs)
+    for _ in range(4):
+        b.record_failure()
+    assert b.state == OPEN
+    return b
+
+def half_open(clock):
+    b = opened()
+    clock[0] += 30
+    assert b.state == HALF_OPEN
+    return b
+
+def test_opens_after_failure_rate_is_reached():
+    b = CircuitBreaker(window=4, min_calls=4)
+    for _ in range(3):
+        b.record_success(0.1)
+        assert b.allow()
+    b.record_failure()
+    b.record_failure()
+    assert b.state == OPEN
+    assert not b.allow()
+    assert b.stats()["rejected"] == 1
+
+def test_opens_when_most_calls_are_slow():
+    b = CircuitBreaker(window=4, min_calls=4, slow_seconds=1.0, slow_rate=0.75)
+    for elapsed in (2.0, 2.0, 0.1, 2.0):
+        b.record_success(elapsed)
+    assert b.state == OPEN
+
+def test_half_open_admits_one_probe(clock):
+    b = half_open(clock)
+    assert b.allow()
+    assert not b.allow()
+
+def test_probe_success_closes(clock):
+    b = half_open(clock)
+    assert b.allow()
+    b.record_success(0.1)
+    assert b.state == CLOSED
+    assert b.allow()
+
+def test_probe_failure_reopens(clock):
+    b = half_open(clock)
+    assert b.allow()
+    b.record_failure()
+    assert b.state == OPEN
+    assert b.stats()["times_opened"] == 2
+
+def test_cancelled_probe_frees_its_slot(clock):
+    b = half_open(clock)
+    assert b.allow()
+    b.record_cancelled()
+    assert b.state == HALF_OPEN
+    assert b.allow()
+
+def test_cancelled_call_while_closed_is_not_counted():
+    b = CircuitBreaker(window=4, min_calls=4)
+    for _ in range(4):
+        b.record_cancelled()
+    assert b.state == CLOSED
+    assert b.stats()["recent_calls"] == 0
+
+def test_lost_probe_expires(clock):
+    b = half_open(clock)
+    assert b.allow()
+    clock[0] += 59
+    assert not b.allow()
+    clock[0] += 1
+    assert b.allow()
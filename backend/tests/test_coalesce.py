@@ -0,0 +1,27 @@
+import os
+
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ.setdefault("RATE_LIMIT", "0")
+
+import pytest
+
+import app
+
+def key_for(message, history=()):
+    return app.coalesce_key(message, [{"role": "user", "content": message}], list(history), None,
+                            app.select_tools(message))
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_deterministic_turns_share_a_key_with_or_without_tool_selection(monkeypatch, enabled):
+    monkeypatch.setattr(app.tool_selector, "enabled", enabled)
+    assert key_for("what is 2+2") == key_for("what is 2+2")
+    assert key_for("hello there") is not None
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_nondeterministic_turns_run_on_their_own(monkeypatch, enabled):
+    monkeypatch.setattr(app.tool_selector, "enabled", enabled)
+    assert key_for("tell me a joke") is None
+    assert key_for("generate a password") is None
+
+def test_turns_with_history_run_on_their_own():
+    assert key_for("hello there", [{"role": "user", "content": "hi"}]) is None
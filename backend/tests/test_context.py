@@ -0,0 +1,56 @@
+from context import ContextWindow
+
+def long_history(secret):
+    return [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "Hello! How can I help?"},
+        {"role": "user", "content": f"My PIN is {secret}, remember it. " + "x" * 800},
+        {"role": "assistant", "content": "y" * 800},
+    ]
+
+def summary_of(messages):
+    return next(m["content"] for m in messages if m["content"].startswith("Summary of"))
+
+def test_conversations_without_id_do_not_share_summaries():
+    window = ContextWindow(budget=200, summary_budget=50)
+    first = window.build("system", long_history("1234"), "what is my PIN?")
+    second = window.build("system", long_history("9876"), "what is my PIN?")
+    assert "1234" in summary_of(first)
+    assert "1234" not in summary_of(second)
+    assert "9876" in summary_of(second)
+
+def test_summary_is_reused_within_a_conversation():
+    window = ContextWindow(budget=200, summary_budget=50)
+    window.build("system", long_history("1234"), "next", conversation_key="c1")
+    window.build("system", long_history("1234"), "next", conversation_key="c1")
+    assert window.summaries_computed == 1
+
+def turns(start, count):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " + "z" * 400}
+        for i in range(start, start + count)
+    ]
+
+def recording_window(calls):
+    def summarize(previous, messages):
+        calls.append(messages[0]["content"].split(" z")[0])
+        return f"{previous} +{len(messages)} turns"
+    return ContextWindow(budget=300, summary_budget=50, refresh_after=4, summarize=summarize)
+
+def test_stateless_history_only_summarizes_new_turns():
+    calls = []
+    window = recording_window(calls)
+    window.build("system", turns(0, 10), "next")
+    window.build("system", turns(0, 12), "next")  # within refresh_after: reused
+    window.build("system", turns(0, 20), "next")
+    assert window.summaries_computed == 2
+    assert calls == ["message 0", "message 8"]  # only the turns folded since the first summary
+
+def test_summary_survives_session_trimming():
+    calls = []
+    window = recording_window(calls)
+    window.build("system", turns(0, 10), "next", conversation_key="c1")
+    # The store dropped the oldest six messages and two turns arrived
+    window.build("system", turns(6, 16), "next", conversation_key="c1")
+    assert window.summaries_computed == 2
+    assert calls == ["message 0", "message 8"]
@@ -0,0 +1,19 @@
+import pytest
+
+import conversions
+from registry import ToolArgumentError, _number
+
+def test_affine_scalar_and_list():
+    assert conversions.affine(10, 2.0, 1.0) == 21.0
+    assert conversions.affine([1, 2], 2.0) == [2.0, 4.0]
+    assert conversions.affine([1] * conversions.NUMPY_MIN_SIZE, 2.0) == [2.0] * conversions.NUMPY_MIN_SIZE
+
+@pytest.mark.parametrize("values", [1e308, 10 ** 400, [1, 1e308], [1e308] * conversions.NUMPY_MIN_SIZE])
+def test_affine_overflow_raises(values):
+    with pytest.raises(OverflowError):
+        conversions.affine(values, conversions.currency_factor("USD", "JPY"))
+
+@pytest.mark.parametrize("value", [float("inf"), float("nan"), "inf"])
+def test_non_finite_numbers_are_rejected(value):
+    with pytest.raises(ToolArgumentError):
+        _number(value, "amount")
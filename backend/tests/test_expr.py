@@ -0,0 +1,60 @@
+import pytest
+
+import expr
+from expr import ExpressionError, evaluate
+
+def test_arithmetic_functions_and_constants():
+    assert evaluate("(3 + 4) * 2 - 1") == 13
+    assert evaluate("2 ** 10 // 3 % 7") == 341 % 7
+    assert evaluate("-sqrt(16) + abs(-2)") == -2.0
+    assert evaluate("round(pi, 2)") == 3.14
+
+@pytest.mark.parametrize("expression", [
+    "9**9**9",
+    f"2 ** {expr.MAX_EXPONENT + 1}",
+    f"2 ** -{expr.MAX_EXPONENT + 1}",
+    f"3 ** {expr.MAX_EXPONENT}",  # exponent allowed, result too large
+    f"2 ** {expr.MAX_RESULT_BITS} * 2 ** {expr.MAX_RESULT_BITS}",
+    "10 ** 400 * 10 ** 900",
+])
+def test_exponent_and_result_size_limits(expression):
+    with pytest.raises(ExpressionError, match="too large"):
+        evaluate(expression)
+
+def test_result_at_the_size_limit_is_allowed():
+    assert evaluate(f"2 ** {expr.MAX_RESULT_BITS - 1}") == 2 ** (expr.MAX_RESULT_BITS - 1)
+
+def test_length_and_step_limits():
+    with pytest.raises(ExpressionError, match="too long"):
+        evaluate("1+" * expr.MAX_LENGTH + "1")
+    with pytest.raises(ExpressionError, match="too complex"):
+        evaluate("+".join(["1"] * expr.MAX_STEPS))
+
+@pytest.mark.parametrize("expression", [
+    "x + 1",
+    "__import__('os')",
+    "open('/etc/passwd')",
+    "print(1)",
+    "sqrt(x=4)",
+    "(1).__class__",
+    "math.pi",
+    "'a' * 3",
+    "True + 1",
+    "[1, 2]",
+    "1 if 1 else 2",
+    "lambda: 1",
+    "1 < 2",
+    "2 ^ 3",
+])
+def test_names_calls_attributes_and_other_syntax_are_rejected(expression):
+    with pytest.raises(ExpressionError):
+        evaluate(expression)
+
+@pytest.mark.parametrize("expression", ["1/0", "1//0", "5 % 0", "0 ** -1"])
+def test_division_by_zero(expression):
+    with pytest.raises(ExpressionError, match="Division by zero"):
+        evaluate(expression)
+
+def test_invalid_syntax():
+    with pytest.raises(ExpressionError, match="Invalid expression"):
+        evaluate("2 +")
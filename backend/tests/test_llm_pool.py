@@ -0,0 +1,86 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from breaker import HALF_OPEN, CircuitBreaker
+from llm_pool import Provider, ProviderPool
+
+class Completions:
+    def __init__(self, chunks=("a", "b"), fail_after=None, delay=0.0):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.delay = delay
+
+    def create(self, stream=False, **kwargs):
+        if stream:
+            return self.stream()
+        return "answer"
+
+    def stream(self):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise ConnectionError("stream dropped")
+            yield chunk
+
+class AsyncCompletions:
+    def __init__(self, delay):
+        self.delay = delay
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        return "answer"
+
+def provider(name="a", completions=None, breaker=None, **kwargs):
+    p = Provider(name, "http://localhost", "key", "model", breaker=breaker, **kwargs)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions or Completions()))
+    p.client = p._async_client = client
+    return p
+
+def half_open_breaker():
+    breaker = CircuitBreaker(window=2, min_calls=2, open_seconds=0)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == HALF_OPEN
+    return breaker
+
+def test_stream_holds_its_slot_until_read():
+    p = provider(max_concurrency=1)
+    pool = ProviderPool([p])
+    stream = pool.complete(stream=True)
+    assert p.in_flight == 1
+    assert pool.pick() is None
+    assert list(stream) == ["a", "b"]
+    assert p.in_flight == 0
+    assert len(p.latencies) == 1
+
+def test_stream_error_reaches_the_breaker():
+    p = provider(completions=Completions(fail_after=1), breaker=half_open_breaker())
+    stream = ProviderPool([p]).complete(stream=True)
+    with pytest.raises(ConnectionError):
+        list(stream)
+    assert p.in_flight == 0
+    assert p.breaker.stats()["times_opened"] == 2
+
+def test_abandoned_stream_frees_the_probe():
+    p = provider(breaker=half_open_breaker())
+    stream = ProviderPool([p]).complete(stream=True)
+    next(stream)
+    stream.close()
+    assert p.in_flight == 0
+    assert p.breaker.state == HALF_OPEN
+    assert p.breaker.allow()
+
+def test_cancelled_hedge_loser_probe_is_not_lost():
+    slow = provider("slow", AsyncCompletions(delay=1.0), breaker=half_open_breaker())
+    fast = provider("fast", AsyncCompletions(delay=0.0))
+    pool = ProviderPool([slow, fast], hedge_min_samples=1, hedge_min_delay=0.01)
+    slow.latencies.append(0.01)
+    fast.latencies.append(0.01)
+    pool.pick = lambda exclude=(): next(p for p in (slow, fast) if p not in exclude and p.try_acquire() and p.breaker.allow())
+
+    assert asyncio.run(pool.acomplete()) == "answer"
+    assert pool.hedge_wins == 1
+    assert slow.in_flight == 0
+    assert slow.breaker.state == HALF_OPEN
+    assert slow.breaker.allow()
@@ -0,0 +1,37 @@
+import math
+
+import pytest
+
+from numtheory import DETERMINISTIC_LIMIT, is_prime
+
+def trial_division(n):
+    return n >= 2 and all(n % d for d in range(2, math.isqrt(n) + 1))
+
+def test_matches_trial_division_for_small_n():
+    assert [n for n in range(-5, 20000) if is_prime(n)] == [n for n in range(-5, 20000) if trial_division(n)]
+
+def test_matches_trial_division_past_the_sieve():
+    # Above 997**2 every answer comes from Miller-Rabin
+    start = 997 ** 2
+    assert [is_prime(n) for n in range(start, start + 3000)] == [trial_division(n) for n in range(start, start + 3000)]
+
+@pytest.mark.parametrize("n", [2, 3, 997, 1009, 1000003, 2 ** 31 - 1, 1000000007, 2 ** 61 - 1, 2 ** 89 - 1, 2 ** 127 - 1])
+def test_known_primes(n):
+    assert is_prime(n)
+
+@pytest.mark.parametrize("n", [561, 1105, 1729, 41041, 825265, 321197185])
+def test_carmichael_numbers_are_composite(n):
+    assert not is_prime(n)
+
+def test_strong_pseudoprime_to_the_first_nine_bases_is_composite():
+    # 149491 * 747451 * 34233211 fools Miller-Rabin with bases 2..23
+    assert not is_prime(3825123056546413051)
+
+def test_values_near_the_digit_limit():
+    # PRIME_MAX_DIGITS defaults to 100: the largest prime below 10**100, and
+    # products of large primes that are past DETERMINISTIC_LIMIT
+    assert 10 ** 100 - 797 > DETERMINISTIC_LIMIT
+    assert is_prime(10 ** 100 - 797)
+    assert not any(is_prime(10 ** 100 - k) for k in range(1, 797, 2))
+    assert not is_prime((2 ** 127 - 1) * (2 ** 89 - 1))
+    assert not is_prime((2 ** 127 - 1) ** 2)
@@ -0,0 +1,38 @@
+import sqlite3
+
+from ratelimit import AdmissionGate, MemoryBucketStore, RateLimiter, SQLiteBucketStore
+
+def test_bucket_refuses_past_burst():
+    limiter = RateLimiter(MemoryBucketStore(), rate=1.0, burst=2)
+    assert limiter.check("a") == 0
+    assert limiter.check("a") == 0
+    assert limiter.check("a") > 0
+    assert limiter.check("b") == 0
+
+def test_sqlite_buckets_are_shared(tmp_path):
+    path = str(tmp_path / "rl.db")
+    first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+    assert first.take("a", rate=0.001, burst=1) == (True, 0.0)
+    allowed, retry_after = second.take("a", rate=0.001, burst=1)
+    assert not allowed and retry_after > 0
+
+def test_sqlite_store_fails_open_while_locked(tmp_path):
+    path = str(tmp_path / "rl.db")
+    store = SQLiteBucketStore(path, timeout=0.05)
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        assert store.take("a", rate=1.0, burst=1) == (True, 0.0)
+        assert store.failed_open == 1
+    finally:
+        other.execute("ROLLBACK")
+    assert store.take("a", rate=0.001, burst=1) == (True, 0.0)
+    assert store.take("a", rate=0.001, burst=1)[0] is False
+
+def test_admission_gate_caps_in_flight():
+    gate = AdmissionGate(max_in_flight=1)
+    assert gate.try_enter()
+    assert not gate.try_enter()
+    gate.leave()
+    assert gate.try_enter()
+    assert gate.stats()["shed"] == 1
@@ -0,0 +1,12 @@
+from replies import ReplyPolicy, render_replies
+
+def test_known_tools_are_templated():
+    policy = ReplyPolicy()
+    assert policy.use_template(["get_joke"])
+    assert render_replies(["flip_coin"], [{"success": True, "output": "Heads"}]) == "🪙 Heads!"
+
+def test_turn_without_known_tools_goes_to_the_llm():
+    policy = ReplyPolicy(mode="template")
+    assert not policy.use_template([])
+    assert not policy.use_template([], style="template", load=1.0)
+    assert policy.counts == {"template": 0, "llm": 2}
@@ -0,0 +1,48 @@
+import pytest
+
+from router import FastPathRouter, detect_intent
+
+@pytest.mark.parametrize("message", [
+    "Write a Python function to compute factorial of 5",
+    "What is the probability of getting 7 when rolling two dice?",
+    "My password is weak, any tips for a stronger one?",
+    "What is the GDP of India in 2020-2021?",
+    "How do I flip a coin fairly without a coin?",
+    "Can you explain why the factorial of 0 is 1 in combinatorics and probability?",
+    "show me the first 10 primes",
+    "factorial of -5",
+])
+def test_mentions_do_not_take_the_fast_path(message):
+    assert FastPathRouter().route(message) is None
+
+@pytest.mark.parametrize("message, tool, arguments", [
+    ("flip a coin", "flip_coin", {}),
+    ("roll a d20", "roll_dice", {"sides": 20}),
+    ("calculate 12*7 please", "calculator", {"expression": "12*7"}),
+    ("what is 2+2", "calculator", {"expression": "2+2"}),
+    ("is 1000000007 prime?", "is_prime", {"number": 1000000007}),
+    ("factorial of 10", "factorial", {"number": 10}),
+    ("what's the weather in Tokyo", "get_weather", {"city": "Tokyo"}),
+    ("generate a password of 16 characters", "generate_password", {"length": 16}),
+    ("first 10 fibonacci numbers", "fibonacci", {"count": 10}),
+    ("shake the magic 8 ball", "magic_8ball", {}),
+])
+def test_direct_requests_take_the_fast_path(message, tool, arguments):
+    intent = FastPathRouter().route(message)
+    assert intent is not None
+    assert intent["name"] == tool
+    assert intent["arguments"] == arguments
+
+def test_calculator_needs_the_arithmetic_to_be_most_of_the_message():
+    intent = detect_intent("What is the GDP of India in 2020-2021?")
+    assert intent is None or intent["name"] != "calculator"
+
+def test_leftover_words_lower_confidence():
+    short = detect_intent("factorial of 5")
+    wordy = detect_intent("write a python function to compute factorial of 5")
+    assert wordy["name"] == short["name"] == "factorial"
+    assert wordy["confidence"] < short["confidence"]
+
+def test_dice_without_sides_is_not_extracted():
+    intent = detect_intent("roll a d0")
+    assert intent is None or intent["name"] != "roll_dice"
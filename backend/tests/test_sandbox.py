@@ -0,0 +1,59 @@
+import os
+import time
+
+import pytest
+
+from sandbox import SandboxError, SandboxPool
+
+def echo(value):
+    return value
+
+def spin():
+    while True:
+        pass
+
+def hog(mb):
+    return len(bytearray(mb * 1024 * 1024))
+
+def crash():
+    os._exit(3)
+
+def nap(seconds):
+    time.sleep(seconds)
+
+@pytest.fixture
+def pool():
+    pool = SandboxPool({"echo": echo, "spin": spin, "hog": hog, "crash": crash},
+                       workers=1, cpu_seconds=1, memory_mb=64, timeout=15)
+    yield pool
+    pool.close()
+
+def test_worker_over_cpu_limit_is_replaced(pool):
+    first_pid = pool._idle.queue[0].pid
+    with pytest.raises(SandboxError, match="CPU time limit exceeded"):
+        pool.call("spin", {})
+    assert pool.killed["cpu"] == 1
+    assert pool._idle.queue[0].pid != first_pid
+    assert pool.call("echo", {"value": 42}) == 42
+
+def test_allocation_over_memory_limit_is_an_error(pool):
+    with pytest.raises(SandboxError, match="Memory limit exceeded"):
+        pool.call("hog", {"mb": 256})
+    assert pool.call("hog", {"mb": 1}) == 1024 * 1024
+    assert pool.stats()["calls"] == 2
+
+def test_crashed_worker_is_replaced(pool):
+    with pytest.raises(SandboxError, match="code 3"):
+        pool.call("crash", {})
+    assert pool.killed["crash"] == 1
+    assert pool.call("echo", {"value": "still serving"}) == "still serving"
+
+def test_wall_clock_timeout_kills_the_worker():
+    pool = SandboxPool({"echo": echo, "nap": nap}, workers=1, cpu_seconds=1, timeout=0.5)
+    try:
+        with pytest.raises(SandboxError, match="Timed out"):
+            pool.call("nap", {"seconds": 5})
+        assert pool.killed["timeout"] == 1
+        assert pool.call("echo", {"value": 1}) == 1
+    finally:
+        pool.close()
@@ -0,0 +1,25 @@
+from sessions import MemorySessionStore
+
+def turn(text):
+    return [{"role": "user", "content": text}]
+
+def test_least_recently_used_conversation_is_evicted():
+    store = MemorySessionStore(max_sessions=2)
+    store.append("a", turn("one"))
+    store.append("b", turn("two"))
+    store.get("a")  # "b" is now the least recently used
+    store.append("c", turn("three"))
+    assert len(store) == 2
+    assert store.get("a") == turn("one")
+    assert store.get("b") == []
+
+def test_history_is_trimmed_to_max_messages():
+    store = MemorySessionStore(max_messages=3)
+    for i in range(5):
+        store.append("a", turn(str(i)))
+    assert [m["content"] for m in store.get("a")] == ["2", "3", "4"]
+
+def test_expired_conversation_is_empty():
+    store = MemorySessionStore(ttl=0)
+    store.append("a", turn("one"))
+    assert store.get("a") == []
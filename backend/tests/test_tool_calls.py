@@ -0,0 +1,39 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ.setdefault("RATE_LIMIT", "0")
+
+import pytest
+
+import app
+
+def lookup(query):
+    time.sleep(2 if query == "hang" else 0.3)
+    return {"tool": "Wikipedia", "input": query, "output": query, "success": True}
+
+@pytest.fixture
+def one_worker(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(app, "tool_executor", executor)
+    monkeypatch.setitem(app.available_functions, "search_wikipedia", lookup)
+    monkeypatch.setitem(app.TOOL_TIMEOUTS, "search_wikipedia", 0.5)
+    yield
+    executor.shutdown(wait=False)
+
+def calls(*queries):
+    return [
+        {"id": f"c{i}", "name": "search_wikipedia", "arguments": json.dumps({"query": q})}
+        for i, q in enumerate(queries)
+    ]
+
+def test_timeout_starts_when_the_call_runs(one_worker):
+    # Queued behind the first call, the second finishes 0.6s after submission
+    results = app.run_tool_calls(calls("a", "b"), "", [])
+    assert [r["output"] for r in results] == ["a", "b"]
+
+def test_running_call_still_times_out(one_worker):
+    results = app.run_tool_calls(calls("hang"), "", [])
+    assert not results[0]["success"]
@@ -0,0 +1,163 @@
+"""Pick the tool schemas worth sending with a tool-selection completion.
+
+Sending all 25 schemas costs about 1,500 prompt tokens on every turn,
+small talk included. `ToolSelector` builds a keyword index over the tool
+names, descriptions and parameter descriptions once at startup (plus the
+fast-path intent keywords and a few synonyms), scores each message against
+it and sends only the best-matching tools. Greetings and thanks get no tools
+at all; anything the index can't place falls back to the full list, so an
+unrecognized request is never left without the tool it needs.
+"""
+import json
+import re
+import threading
+
+from context import estimate_tokens
+from router import INTENT_KEYWORDS
+
+# Words in descriptions that say nothing about which tool is meant
+STOPWORDS = frozenset("""
+    a an and are as at be by can default do for from get if in is it like me
+    my of on or please the this that to how many much what will with your you
+""".split())
+
+# Vocabulary the descriptions don't use but users do
+TOOL_SYNONYMS = {
+    "get_time": ["clock", "day", "month", "year"],
+    "calculate_age": ["old", "born", "birthday", "age"],
+    "days_until": ["until", "countdown", "left"],
+    "calculator": ["plus", "minus", "times", "divided", "sum", "multiply", "sqrt"],
+    "get_weather": ["rain", "sunny", "forecast", "hot", "cold", "humidity"],
+    "count_words": ["words", "length"],
+    "reverse_text": ["backwards", "reversed"],
+    "text_to_uppercase": ["upper", "caps", "capital", "capitals"],
+    "text_to_lowercase": ["lower", "small"],
+    "convert_currency": ["usd", "eur", "inr", "gbp", "jpy", "dollar", "dollars", "euro", "euros",
+                         "rupee", "rupees", "pound", "pounds", "yen", "exchange", "money"],
+    "convert_temperature": ["celsius", "fahrenheit", "kelvin", "degrees"],
+    "encode_base64": ["base64", "encode"],
+    "decode_base64": ["base64", "decode"],
+    "random_number": ["pick", "between"],
+}
+
+# Messages made only of these words are small talk: no tools at all
+SMALL_TALK = frozenset("""
+    hi hello hey hiya yo thanks thank you thx ok okay cool great nice awesome
+    good morning afternoon evening night bye goodbye see ya how are doing
+    what's up sup i'm im fine well i am and there so much very too lot friend
+    buddy again all
+""".split())
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+def _words(text):
+    return [w for w in WORD_RE.findall(text.lower().replace("_", " ")) if w not in STOPWORDS and len(w) > 1]
+
+class ToolSelector:
+    def __init__(self, schemas, max_tools=6, enabled=True):
+        self.schemas = list(schemas)
+        self.max_tools = max_tools
+        self.enabled = enabled
+        self.order = [schema["function"]["name"] for schema in self.schemas]
+        self.by_name = dict(zip(self.order, self.schemas))
+        # Prompt cost of each schema, as sent (serialized JSON)
+        self.cost = {name: estimate_tokens(json.dumps(schema)) for name, schema in self.by_name.items()}
+        self.full_cost = sum(self.cost.values())
+        self.token_re, self.index = self._build_index()
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.subset = 0
+        self.small_talk = 0
+        self.fallbacks = 0
+        self.tokens_saved = 0
+
+    def _build_index(self):
+        """keyword -> {tool: weight}; phrases become single tokens like in router.py"""
+        index = {}
+
+        def add(keyword, name, weight):
+            tools = index.setdefault(keyword, {})
+            tools[name] = max(tools.get(name, 0), weight)
+
+        for name, schema in self.by_name.items():
+            function = schema["function"]
+            for word in _words(name):
+                add(word, name, 2)
+            for word in _words(function["description"]):
+                add(word, name, 1)
+            for param in function["parameters"]["properties"].values():
+                for word in _words(param.get("description", "")):
+                    add(word, name, 0.5)
+            for word in TOOL_SYNONYMS.get(name, []):
+                add(word, name, 2)
+        for name, keywords in INTENT_KEYWORDS.items():
+            if name in self.by_name:
+                for keyword in keywords:
+                    add(keyword, name, 2)
+
+        # Words shared by many tools ("text", "number") separate nothing; drop them
+        common = len(self.by_name) // 4
+        index = {k: tools for k, tools in index.items() if len(tools) <= max(common, 2)}
+
+        phrases = sorted((k for k in index if " " in k), key=len, reverse=True)
+        pattern = r"\b(?:" + "|".join(re.escape(p) for p in phrases) + r")\b|[a-z0-9']+"
+        return re.compile(pattern), index
+
+    def score(self, user_message):
+        """{tool: score} for the tools the message mentions"""
+        scores = {}
+        for token in set(self.token_re.findall(user_message.lower())):
+            for name, weight in self.index.get(token, {}).items():
+                scores[name] = scores.get(name, 0) + weight
+        return scores
+
+    def select(self, user_message):
+        """(schemas, reason) to send for this message; reason is "subset", "small_talk", "fallback" or "disabled"."""
+        if not self.enabled:
+            return self.schemas, "disabled"
+        return self.match(user_message)
+
+    def match(self, user_message):
+        """(schemas, reason) the message calls for, whether or not selection is enabled"""
+        words = WORD_RE.findall(user_message.lower())
+        if words and all(word in SMALL_TALK for word in words):
+            return [], "small_talk"
+        scores = self.score(user_message)
+        if not scores:
+            return self.schemas, "fallback"
+        # Tools that only share a stray word with the message ("convert" in a
+        # currency question) score under half the best match and are left out
+        top = max(scores.values())
+        ranked = sorted((name for name in scores if scores[name] * 2 > top),
+                        key=lambda name: (-scores[name], self.order.index(name)))
+        best = ranked[:self.max_tools]
+        return [self.by_name[name] for name in self.order if name in best], "subset"
+
+    def record(self, selected, reason):
+        """Count a selection; returns the prompt tokens it saved"""
+        saved = self.full_cost - sum(self.cost[s["function"]["name"]] for s in selected)
+        with self._lock:
+            self.requests += 1
+            self.tokens_saved += saved
+            if reason == "subset":
+                self.subset += 1
+            elif reason == "small_talk":
+                self.small_talk += 1
+            elif reason == "fallback":
+                self.fallbacks += 1
+        return saved
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "max_tools": self.max_tools,
+                "full_tokens": self.full_cost,
+                "requests": self.requests,
+                "subset": self.subset,
+                "small_talk": self.small_talk,
+                "fallbacks": self.fallbacks,
+                "tokens_saved": self.tokens_saved,
+                "avg_tokens_saved": round(self.tokens_saved / self.requests, 1) if self.requests else 0.0,
+            }
@@ -6,7 +6,7 @@ function App() {
   const [messages, setMessages] = useState([]);
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
-  const [history, setHistory] = useState([]);
+  const [conversationId, setConversationId] = useState(null);
   const messagesEndRef = useRef(null);
 
   const scrollToBottom = () => {
@@ -27,38 +27,74 @@ function App() {
     setIsLoading(true);
 
     try {
-      const response = await fetch('http://localhost:5000/chat', {
+      const response = await fetch('http://localhost:5000/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
           message: userMessage,
-          history: history
+          conversation_id: conversationId
         }),
       });
 
-      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(`Server returned ${response.status}`);
+      }
 
-      if (data.error) {
-        setMessages(prev => [...prev, { 
-          role: 'error', 
-          content: `Error: ${data.error}` 
-        }]);
-      } else {
-        if (data.tool_calls && data.tool_calls.length > 0) {
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      // Append a token to the streaming assistant message, creating it on the first token
+      const appendToken = (token) => {
+        setMessages(prev => {
+          const last = prev[prev.length - 1];
+          if (last && last.role === 'assistant' && last.streaming) {
+            return [...prev.slice(0, -1), { ...last, content: last.content + token }];
+          }
+          return [...prev, { role: 'assistant', content: token, streaming: true }];
+        });
+      };
+
+      const handleEvent = (event, data) => {
+        if (event === 'tool_calls' && data.length > 0) {
           setMessages(prev => [...prev, { 
             role: 'tool_calls', 
-            content: data.tool_calls 
+            content: data 
           }]);
+        } else if (event === 'token') {
+          appendToken(data.content);
+        } else if (event === 'reset') {
+          setMessages(prev => {
+            const last = prev[prev.length - 1];
+            return last && last.role === 'assistant' && last.streaming ? prev.slice(0, -1) : prev;
+          });
+        } else if (event === 'done') {
+          setMessages(prev => prev.map(m => (m.streaming ? { ...m, streaming: false } : m)));
+          setConversationId(data.conversation_id);
+        }
+      };
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Server-Sent Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const rawEvent = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+
+          let event = 'message';
+          let data = '';
+          for (const line of rawEvent.split('\n')) {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+          }
+          if (data) handleEvent(event, JSON.parse(data));
         }
-
-        setMessages(prev => [...prev, { 
-          role: 'assistant', 
-          content: data.response 
-        }]);
-
-        setHistory(data.history);
       }
     } catch (error) {
       setMessages(prev => [...prev, { 
@@ -173,7 +209,7 @@ function App() {
               </div>
             ))}
 
-            {isLoading && (
+            {isLoading && !messages[messages.length - 1]?.streaming && (
               <div className="message-row assistant-row">
                 <div className="avatar bot-avatar">
                   <Bot size={20} />